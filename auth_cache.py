@@ -0,0 +1,89 @@
+import copy
+import hashlib
+import time
+
+import jwt
+from fastapi import Depends, Header, HTTPException, status
+
+from database import get_database
+from lru_cache import LRUCache
+from metrics import register_app_state
+from settings import settings
+
+# 인증 캐시
+# - 토큰 캐시: 서명 검증이 끝난 JWT payload를 토큰 해시로 보관 (exp 지나면 사용 안 함)
+# - 유저 캐시: username -> users 문서, 짧은 TTL. 리프레시 토큰이 바뀌면 무효화
+
+
+def _unauthorized(detail: str):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+token_cache = LRUCache(settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = LRUCache(settings.AUTH_USER_CACHE_SIZE)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def verify_token(token: str) -> dict:
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise _unauthorized("Token has expired")
+    except jwt.PyJWTError:
+        raise _unauthorized("Invalid token")
+    if "exp" in payload:
+        token_cache.set(key, payload, float(payload["exp"]))
+    return payload
+
+
+def forget_token(token: str):
+    token_cache.delete(_token_key(token))
+
+
+# Authorization: Bearer <token>
+async def get_token_payload(authorization: str = Header(...)) -> dict:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise _unauthorized("Invalid token")
+    return verify_token(token)
+
+
+async def get_user_by_username(db, username: str):
+    user = user_cache.get(username)
+    if user is None:
+        user = await db.users.find_one({"username": username})
+        if user is None:
+            return None
+        user_cache.set(username, user, time.time() + settings.AUTH_USER_CACHE_TTL_S)
+    return copy.copy(user)
+
+
+def invalidate_user(username: str):
+    user_cache.delete(username)
+
+
+# 라우터 공용 의존성: 현재 로그인한 유저 문서
+async def get_current_user(payload: dict = Depends(get_token_payload), db=Depends(get_database)):
+    username = payload.get("sub")
+    if username is None:
+        raise _unauthorized("Invalid token")
+    user = await get_user_by_username(db, username)
+    if user is None:
+        raise _unauthorized("Invalid token")
+    return user
+
+
+# 캐시 상태는 /metrics로만 노출
+register_app_state("auth_cache_tokens", token_cache.stats)
+register_app_state("auth_cache_users", user_cache.stats)
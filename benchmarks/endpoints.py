@@ -0,0 +1,247 @@
+# 주요 엔드포인트 처리량 / 지연시간 벤치마크 (서버를 띄우지 않고 httpx ASGITransport로 main.app 직접 호출)
+# 실행: python -m benchmarks.endpoints [--backend fake|mongod] [--requests 300] [--concurrency 20] [--output bench_results.json]
+# - fake: benchmarks.fake_motor 인메모리 DB, --latency-ms로 Mongo 왕복 지연을 주입
+# - mongod: --mongo-url의 로컬 mongod에 임시 DB를 만들어 사용하고 끝나면 삭제
+# --compare 이전 결과 JSON을 주면 p95 변화율도 출력
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.fake_motor import FakeDatabase
+from benchmarks.route_codec import make_route
+from database import get_analytics_database, get_database
+from geo_cache import MemoryCacheBackend, course_cache
+from main import app
+from stats_rollup import DAILY_STATS_CHECKPOINT, record_daily_run, statistics_update_pipeline
+
+BENCH_DATABASE = "runaway_bench"
+CENTER = (37.5665, 126.9780)
+PASSWORD = "bench-password"
+STATS_ENDPOINTS = ("weekly_data", "monthly_data", "yearly_data", "all_time_data")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def jitter(lat: float, lng: float, rng: random.Random, meters: float):
+    distance, bearing = rng.uniform(0, meters), rng.uniform(0, 2 * math.pi)
+    return (
+        lat + distance * math.cos(bearing) / 111_320,
+        lng + distance * math.sin(bearing) / (111_320 * math.cos(math.radians(lat))),
+    )
+
+
+# 벤치마크용 데이터: 로그인 유저 1명(실제 /users/register) + 러닝 기록 + 주변 코스 + 종료할 세션
+async def seed(client: httpx.AsyncClient, db, args, rng: random.Random):
+    username = f"bench-{uuid.uuid4().hex[:8]}"
+    response = await client.post("/users/register", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    user_oid = ObjectId(user_id)
+
+    # 최근 1년간의 런 -> runs / daily_stats / statistics를 종료 시점과 같은 방식으로 채움
+    now = datetime.now(timezone.utc)
+    dates = sorted(now - timedelta(days=rng.uniform(0, 365)) for _ in range(args.history_runs))
+    runs = []
+    for date in dates:
+        distance, duration = round(rng.uniform(2, 15), 2), rng.randint(600, 5400)
+        pace = duration / 60 / distance
+        runs.append({"user_id": user_oid, "date": date, "distance": distance, "duration": duration, "average_pace": pace})
+        await db.statistics.update_one({"user_id": user_oid}, statistics_update_pipeline(date, distance, duration, pace), upsert=True)
+        await record_daily_run(db, user_id, date, distance, duration)
+    if runs:
+        await db.runs.insert_many(runs)
+    # 그래프가 daily_stats를 읽도록 백필 완료 표시 (seed는 daily_stats도 함께 채움)
+    await db.rebuild_checkpoints.update_one(
+        {"_id": DAILY_STATS_CHECKPOINT}, {"$set": {"completed_at": now}}, upsert=True
+    )
+
+    courses = []
+    for _ in range(args.courses):
+        lat, lng = jitter(*CENTER, rng, args.course_spread_m)
+        coordinates = [[lng, lat]]
+        for _ in range(9):
+            lat, lng = jitter(lat, lng, rng, 200)
+            coordinates.append([lng, lat])
+        courses.append({
+            "route_coordinate": {"type": "LineString", "coordinates": coordinates},
+            "distance": round(rng.uniform(1, 10), 2),
+            "created_by": user_oid,
+            "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+            "course_type": rng.randint(0, 1),
+            "recommendation_count": rng.randint(0, 500),
+        })
+    if courses:
+        await db.courses.insert_many(courses)
+
+    sessions = [{"start_time": now, "status": "in_progress", "user_id": user_oid} for _ in range(args.requests)]
+    result = await db.running_sessions.insert_many(sessions)
+    return {"user_id": user_id, "username": username, "session_ids": [str(i) for i in result.inserted_ids]}
+
+
+def end_body(points: int):
+    route = make_route(points)
+    return {
+        "distance": 5.0,
+        "duration": 1800,
+        "average_pace": 6.0,
+        "lat": [p["lat"] for p in route],
+        "lng": [p["lng"] for p in route],
+        "t": [p["t"] for p in route],
+        "alt": [p["alt"] for p in route],
+    }
+
+
+# 시나리오 이름 -> (요청 수, 요청 함수)
+def build_scenarios(state, args, rng: random.Random):
+    body = end_body(args.route_points)
+    sessions = iter(state["session_ids"])
+    user_id = state["user_id"]
+
+    def end(client):
+        return client.post(f"/running_sessions/{next(sessions)}/end", json=body)
+
+    def recommend(client):
+        lat, lng = jitter(*CENTER, rng, args.course_spread_m)
+        return client.post("/courses/recommend", json={"latitude": lat, "longitude": lng})
+
+    def login(client):
+        return client.post("/users/login", json={"username": state["username"], "password": PASSWORD})
+
+    scenarios = {
+        "running_sessions.end": (args.requests, end),
+        "courses.recommend": (args.requests, recommend),
+    }
+    for name in STATS_ENDPOINTS:
+        scenarios[f"stats.{name}"] = (args.requests, lambda client, name=name: client.get(f"/stats/{name}/{user_id}"))
+    scenarios["stats.dashboard"] = (args.requests, lambda client: client.get(f"/stats/dashboard/{user_id}"))
+    scenarios["users.login"] = (args.login_requests, login)
+    return scenarios
+
+
+async def run_scenario(client: httpx.AsyncClient, count: int, request, concurrency: int):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": count,
+        "errors": errors,
+        "req_per_s": round(count / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="In-process throughput/latency benchmark for the main endpoints")
+    parser.add_argument("--backend", choices=("fake", "mongod"), default="fake")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected round-trip latency for the fake backend")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--history-runs", type=int, default=300)
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--course-spread-m", type=float, default=10_000)
+    parser.add_argument("--route-points", type=int, default=1800)
+    parser.add_argument("--no-course-cache", action="store_true", help="Measure /courses/recommend without the geohash cache")
+    parser.add_argument("--only", default=None, help="Comma-separated scenario names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare p95 against")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    mongo_client = None
+    if args.backend == "fake":
+        db = FakeDatabase(latency_ms=args.latency_ms)
+    else:
+        mongo_client = AsyncIOMotorClient(args.mongo_url)
+        db = mongo_client.get_database(f"{BENCH_DATABASE}_{uuid.uuid4().hex[:8]}")
+        from indexes import sync_indexes
+        await sync_indexes(db)
+
+    # ASGITransport는 lifespan(startup)을 실행하지 않으므로 Mongo 연결 대신 DB 의존성을 교체
+    app.dependency_overrides[get_database] = lambda: db
+    app.dependency_overrides[get_analytics_database] = lambda: db
+    if args.no_course_cache:
+        course_cache.backend = MemoryCacheBackend(0)
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            state = await seed(client, db, args, rng)
+            scenarios = build_scenarios(state, args, rng)
+            selected = args.only.split(",") if args.only else list(scenarios)
+            print(f"{'scenario':<26} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for name in selected:
+                count, request = scenarios[name]
+                results[name] = result = await run_scenario(client, count, request, args.concurrency)
+                print(f"{name:<26} {result['req_per_s']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>7}")
+    finally:
+        app.dependency_overrides.clear()
+        if mongo_client is not None:
+            await mongo_client.drop_database(db.name)
+            mongo_client.close()
+
+    report = {
+        "meta": {
+            "backend": args.backend,
+            "latency_ms": args.latency_ms if args.backend == "fake" else None,
+            "concurrency": args.concurrency,
+            "route_points": args.route_points,
+            "course_cache": not args.no_course_cache,
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+        print(f"{'scenario':<26} {'p95 before':>11} {'p95 after':>10} {'change':>8}")
+        for name, result in results.items():
+            if name in previous:
+                before, after = previous[name]["p95_ms"], result["p95_ms"]
+                print(f"{name:<26} {before:>11.2f} {after:>10.2f} {(after - before) / before * 100:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,581 @@
+# 벤치마크용 인메모리 Motor 대체 구현
+# 라우터가 쓰는 연산만 지원: insert/find/find_one/sort/limit/to_list/async for, update_one(연산자·파이프라인, upsert),
+# find_one_and_update, bulk_write, delete_many, count_documents, aggregate($geoNear/$match/$sort/$limit/$project/$group)
+# latency_ms를 주면 매 호출마다 네트워크 왕복 시간을 흉내 낸다
+import asyncio
+import copy
+import math
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+
+_MISSING = object()
+EARTH_RADIUS_M = 6_371_000.0
+
+
+def _norm(value):
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+# ---------- 쿼리 필터 ----------
+
+def _compare(op, value, arg):
+    if value is _MISSING:
+        return op in ("$ne", "$nin") or (op == "$exists" and not arg)
+    value, arg = _norm(value), _norm(arg)
+    try:
+        if op == "$eq":
+            return value == arg
+        if op == "$ne":
+            return value != arg
+        if op == "$gt":
+            return value is not None and value > arg
+        if op == "$gte":
+            return value is not None and value >= arg
+        if op == "$lt":
+            return value is not None and value < arg
+        if op == "$lte":
+            return value is not None and value <= arg
+    except TypeError:
+        return False
+    if op == "$in":
+        return value in [_norm(a) for a in arg]
+    if op == "$nin":
+        return value not in [_norm(a) for a in arg]
+    if op == "$exists":
+        return bool(arg)
+    if op == "$type":
+        types = {"array": list, "binData": bytes, "object": dict, "string": str, "date": datetime}
+        return isinstance(value, types[arg])
+    raise NotImplementedError(f"Unsupported query operator: {op}")
+
+
+# 쿼리에서 배열 필드는 원소 중 하나라도 같으면 $eq, 하나도 없으면 $ne
+def _match_operator(op, value, arg):
+    if isinstance(value, list) and op in ("$eq", "$ne") and not isinstance(arg, list):
+        return (_norm(arg) in [_norm(v) for v in value]) == (op == "$eq")
+    return _compare(op, value, arg)
+
+
+def matches(doc, query):
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        else:
+            value = get_path(doc, key)
+            if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+                if not all(_match_operator(op, value, arg) for op, arg in cond.items()):
+                    return False
+            elif isinstance(value, list) and not isinstance(cond, list):
+                if _norm(cond) not in [_norm(v) for v in value]:
+                    return False
+            elif value is _MISSING:
+                if cond is not None:
+                    return False
+            elif _norm(value) != _norm(cond):
+                return False
+    return True
+
+
+# ---------- 정렬 / 프로젝션 ----------
+
+def _sort_key(value):
+    if value is _MISSING or value is None:
+        return (0, 0)
+    value = _norm(value)
+    if isinstance(value, ObjectId):
+        return (2, value.binary)
+    return (1, value)
+
+
+def sort_docs(docs, spec):
+    for key, direction in reversed(list(spec)):
+        docs.sort(key=lambda d: _sort_key(get_path(d, key)), reverse=direction < 0)
+    return docs
+
+
+def _normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def project(doc, projection, computed_ok=False):
+    if not projection:
+        return copy.deepcopy(doc)
+    computed = {k: v for k, v in projection.items() if not isinstance(v, (bool, int))}
+    flags = {k: bool(v) for k, v in projection.items() if k not in computed}
+    include_id = flags.pop("_id", True)
+    inclusion = any(flags.values()) or bool(computed)
+    if inclusion:
+        result = {}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for path, keep in flags.items():
+            value = get_path(doc, path)
+            if keep and value is not _MISSING:
+                set_path(result, path, copy.deepcopy(value))
+        for path, expr in computed.items():
+            if not computed_ok:
+                raise NotImplementedError("Computed fields are only supported in $project")
+            set_path(result, path, evaluate(expr, doc))
+        return result
+    result = copy.deepcopy(doc)
+    for path in flags:
+        unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+# ---------- 집계 표현식 ----------
+
+def evaluate(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(e, doc) for e in expr]
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            op, arg = next(iter(expr.items()))
+            if op.startswith("$"):
+                return _operator(op, arg, doc)
+        return {k: evaluate(v, doc) for k, v in expr.items()}
+    return expr
+
+
+def _operator(op, arg, doc):
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return evaluate(arg[1], doc) if evaluate(arg[0], doc) else evaluate(arg[2], doc)
+    if op == "$ifNull":
+        for item in arg:
+            value = evaluate(item, doc)
+            if value is not None:
+                return value
+        return None
+    if op == "$concatArrays":
+        return [item for array in evaluate(arg, doc) for item in (array or [])]
+    if op == "$slice":
+        array, n = evaluate(arg, doc)
+        return array[:n] if n >= 0 else array[n:]
+    if op == "$dateFromParts":
+        parts = {k: evaluate(v, doc) for k, v in arg.items()}
+        return datetime(parts["year"], parts.get("month", 1), parts.get("day", 1), tzinfo=timezone.utc)
+    if op == "$dateTrunc":
+        value = _norm(evaluate(arg["date"], doc))
+        if value is None:
+            return None
+        day = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        unit = arg["unit"]
+        if unit == "day":
+            return day
+        if unit == "week":  # startOfWeek: monday만 지원
+            return day - timedelta(days=value.weekday())
+        if unit == "month":
+            return day.replace(day=1)
+        if unit == "year":
+            return day.replace(month=1, day=1)
+        raise NotImplementedError(f"Unsupported $dateTrunc unit: {unit}")
+    if op in ("$isoDayOfWeek", "$dayOfMonth", "$month", "$year"):
+        value = _norm(evaluate(arg, doc))
+        return {
+            "$isoDayOfWeek": lambda d: d.isoweekday(),
+            "$dayOfMonth": lambda d: d.day,
+            "$month": lambda d: d.month,
+            "$year": lambda d: d.year,
+        }[op](value)
+
+    values = [_norm(v) for v in evaluate(arg if isinstance(arg, list) else [arg], doc)]
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        return _compare(op, values[0] if values[0] is not None else None, values[1])
+    if op == "$add":
+        return sum(v or 0 for v in values)
+    if op == "$subtract":
+        return values[0] - values[1]
+    if op == "$multiply":
+        return math.prod(v or 0 for v in values)
+    if op == "$divide":
+        return values[0] / values[1]
+    if op == "$max":
+        return max(v for v in values if v is not None)
+    if op == "$min":
+        return min(v for v in values if v is not None)
+    raise NotImplementedError(f"Unsupported expression operator: {op}")
+
+
+# ---------- 업데이트 ----------
+
+def _push(doc, path, spec):
+    current = get_path(doc, path)
+    items = [] if current is _MISSING else list(current)
+    if isinstance(spec, dict) and "$each" in spec:
+        items.extend(copy.deepcopy(spec["$each"]))
+        if "$sort" in spec:
+            order = spec["$sort"]
+            if isinstance(order, dict):
+                sort_docs(items, order.items())
+            else:
+                items.sort(key=_sort_key, reverse=order < 0)
+        if "$slice" in spec:
+            n = spec["$slice"]
+            items = items[:n] if n >= 0 else items[n:]
+    else:
+        items.append(copy.deepcopy(spec))
+    set_path(doc, path, items)
+
+
+def apply_update(doc, update, inserting=False):
+    if isinstance(update, list):
+        for stage in update:
+            (name, fields), = stage.items()
+            if name in ("$set", "$addFields"):
+                values = {path: evaluate(expr, doc) for path, expr in fields.items()}
+                for path, value in values.items():
+                    set_path(doc, path, value)
+            elif name == "$unset":
+                for path in [fields] if isinstance(fields, str) else fields:
+                    unset_path(doc, path)
+            else:
+                raise NotImplementedError(f"Unsupported update pipeline stage: {name}")
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            current = get_path(doc, path)
+            if op == "$set":
+                set_path(doc, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(doc, path, copy.deepcopy(value))
+            elif op == "$unset":
+                unset_path(doc, path)
+            elif op == "$inc":
+                set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$max":
+                if current is _MISSING or _norm(value) > _norm(current):
+                    set_path(doc, path, value)
+            elif op == "$min":
+                if current is _MISSING or _norm(value) < _norm(current):
+                    set_path(doc, path, value)
+            elif op == "$push":
+                _push(doc, path, value)
+            elif op == "$addToSet":
+                items = [] if current is _MISSING else current
+                if value not in items:
+                    set_path(doc, path, items + [copy.deepcopy(value)])
+            else:
+                raise NotImplementedError(f"Unsupported update operator: {op}")
+
+
+def _upsert_seed(query):
+    seed = {}
+    for key, value in query.items():
+        if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value)):
+            set_path(seed, key, copy.deepcopy(value))
+    return seed
+
+
+# ---------- 집계 파이프라인 ----------
+
+def _haversine(lng1, lat1, lng2, lat2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _geometry_points(geometry):
+    coordinates = geometry.get("coordinates") if isinstance(geometry, dict) else None
+    if not coordinates:
+        return []
+    if not isinstance(coordinates[0], list):
+        return [coordinates]
+    while isinstance(coordinates[0][0], list):
+        coordinates = [c for ring in coordinates for c in ring]
+    return coordinates
+
+
+def _geo_near(docs, spec, field):
+    lng, lat = spec["near"]["coordinates"]
+    results = []
+    for doc in docs:
+        points = _geometry_points(doc.get(field))
+        if not points or not matches(doc, spec.get("query")):
+            continue
+        distance = min(_haversine(lng, lat, p[0], p[1]) for p in points)
+        if distance <= spec.get("maxDistance", float("inf")):
+            doc = copy.deepcopy(doc)
+            set_path(doc, spec["distanceField"], distance)
+            results.append((distance, doc))
+    results.sort(key=lambda item: item[0])
+    return [doc for _, doc in results]
+
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        group_key = repr(key)
+        if group_key not in groups:
+            groups[group_key] = {"_id": key}
+        group = groups[group_key]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            value = evaluate(expr, doc)
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value or 0)
+            elif op == "$max":
+                group[field] = value if field not in group else max(group[field], value)
+            elif op == "$min":
+                group[field] = value if field not in group else min(group[field], value)
+            elif op == "$first":
+                group.setdefault(field, value)
+            elif op == "$last":
+                group[field] = value
+            elif op == "$push":
+                group.setdefault(field, []).append(value)
+            else:
+                raise NotImplementedError(f"Unsupported accumulator: {op}")
+    return list(groups.values())
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+
+    async def _round_trip(self):
+        await self.database.round_trip()
+
+    def _find(self, query):
+        return [doc for doc in self.docs if matches(doc, query)]
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        document.setdefault("_id", ObjectId())
+        self.docs.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents, ordered=True):
+        await self._round_trip()
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            self.docs.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_ids=[d["_id"] for d in documents], acknowledged=True)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        await self._round_trip()
+        docs = self._find(query)
+        if sort:
+            sort_docs(docs, _normalize_sort(sort))
+        return project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(self, lambda: self._find(query), projection)
+
+    def _update(self, query, update, upsert):
+        docs = self._find(query)
+        if docs:
+            before = copy.deepcopy(docs[0])
+            apply_update(docs[0], update)
+            return docs[0], before, None
+        if not upsert:
+            return None, None, None
+        doc = _upsert_seed(query)
+        apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return doc, None, doc["_id"]
+
+    async def update_one(self, query, update, upsert=False):
+        await self._round_trip()
+        doc, before, upserted_id = self._update(query, update, upsert)
+        matched = 1 if before is not None else 0
+        modified = 1 if before is not None and before != doc else 0
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id, acknowledged=True)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False, return_document=ReturnDocument.BEFORE):
+        await self._round_trip()
+        if sort:
+            candidates = sort_docs(self._find(query), _normalize_sort(sort))
+            if candidates:
+                query = {"_id": candidates[0]["_id"]}
+        doc, before, _ = self._update(query, update, upsert)
+        result = doc if return_document == ReturnDocument.AFTER else before
+        return project(result, projection) if result is not None else None
+
+    async def delete_many(self, query):
+        await self._round_trip()
+        keep = [doc for doc in self.docs if not matches(doc, query)]
+        deleted = len(self.docs) - len(keep)
+        self.docs = keep
+        return SimpleNamespace(deleted_count=deleted, acknowledged=True)
+
+    async def delete_one(self, query):
+        await self._round_trip()
+        docs = self._find(query)
+        if docs:
+            self.docs.remove(docs[0])
+        return SimpleNamespace(deleted_count=len(docs[:1]), acknowledged=True)
+
+    async def count_documents(self, query):
+        await self._round_trip()
+        return len(self._find(query))
+
+    async def estimated_document_count(self):
+        await self._round_trip()
+        return len(self.docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        await self._round_trip()
+        for operation in operations:
+            if isinstance(operation, UpdateOne):
+                self._update(operation._filter, operation._doc, operation._upsert)
+            elif isinstance(operation, InsertOne):
+                operation._doc.setdefault("_id", ObjectId())
+                self.docs.append(copy.deepcopy(operation._doc))
+            elif isinstance(operation, DeleteOne):
+                docs = self._find(operation._filter)
+                if docs:
+                    self.docs.remove(docs[0])
+            else:
+                raise NotImplementedError(f"Unsupported bulk operation: {type(operation).__name__}")
+        return SimpleNamespace(acknowledged=True)
+
+    def aggregate(self, pipeline):
+        def run():
+            docs = list(self.docs)
+            for stage in pipeline:
+                (name, spec), = stage.items()
+                if name == "$geoNear":
+                    docs = _geo_near(docs, spec, spec.get("key", "route_coordinate"))
+                elif name == "$match":
+                    docs = [doc for doc in docs if matches(doc, spec)]
+                elif name == "$sort":
+                    docs = sort_docs(list(docs), spec.items())
+                elif name == "$limit":
+                    docs = docs[:spec]
+                elif name == "$skip":
+                    docs = docs[spec:]
+                elif name == "$project":
+                    docs = [project(doc, spec, computed_ok=True) for doc in docs]
+                elif name == "$group":
+                    docs = _group(docs, spec)
+                elif name == "$facet":
+                    docs = [{key: self._run_sub(docs, sub) for key, sub in spec.items()}]
+                else:
+                    raise NotImplementedError(f"Unsupported aggregation stage: {name}")
+            return [copy.deepcopy(doc) for doc in docs]
+
+        return FakeCursor(self, run, None, presorted=True)
+
+    def _run_sub(self, docs, pipeline):
+        sub = FakeCollection(self.database, self.name)
+        sub.docs = docs
+        return sub.aggregate(pipeline)._load()
+
+
+class FakeCursor:
+    def __init__(self, collection, loader, projection, presorted=False):
+        self.collection = collection
+        self.loader = loader
+        self.projection = projection
+        self.presorted = presorted
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def _load(self):
+        docs = self.loader()
+        if self._sort:
+            docs = sort_docs(list(docs), self._sort)
+        if self._limit:
+            docs = docs[:self._limit]
+        if self.presorted and self.projection is None:
+            return docs
+        return [project(doc, self.projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        await self.collection._round_trip()
+        docs = self._load()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self.collection._round_trip()
+        for doc in self._load():
+            yield doc
+
+
+class FakeDatabase:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.collections = {}
+        self.round_trips = 0
+
+    async def round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,98 @@
+# 런 종료(finalize) 지연시간 비교: 기존 순차 처리 vs find_one_and_update + 동시 쓰기
+# fake_motor에 Mongo 왕복 지연을 주입해 왕복 횟수 차이가 지연시간에 어떻게 반영되는지 측정
+# 실행: python -m benchmarks.finalize_latency [--latency-ms 5] [--runs 200] [--concurrency 10]
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from benchmarks.endpoints import end_body, percentile
+from benchmarks.fake_motor import FakeDatabase
+from models import Run
+from routes.running_sessions import RunningSessionCreate, build_route_fields, end_running_session
+from route_metrics import compute_run_metrics
+from stats_rollup import record_daily_run, statistics_update_pipeline
+
+
+# 변경 전 흐름: 세션 조회 -> 세션 갱신(경로 포함) -> 유저 조회 -> 런 저장 -> 통계 -> 일별 집계
+async def legacy_end_running_session(session_id: str, session_data: RunningSessionCreate, db):
+    session = await db.running_sessions.find_one({"_id": ObjectId(session_id)})
+    columns = session_data.route_columns()
+    route_fields = build_route_fields(columns, session_data.route)
+    metrics = compute_run_metrics(columns) if columns is not None else None
+    await db.running_sessions.update_one({"_id": ObjectId(session_id)}, {"$set": {
+        "end_time": datetime.now(timezone.utc),
+        "distance": session_data.distance,
+        "duration": session_data.duration,
+        "average_pace": session_data.average_pace,
+        **route_fields,
+        "status": "completed"
+    }})
+    user_id = session["user_id"]
+    await db.users.find_one({"_id": ObjectId(user_id)})
+    run_data = Run(
+        user_id=user_id,
+        date=datetime.now(timezone.utc),
+        distance=session_data.distance,
+        duration=session_data.duration,
+        average_pace=session_data.average_pace,
+        **route_fields,
+        metrics=metrics
+    )
+    await db.runs.insert_one(run_data.dict(by_alias=True))
+    pipeline = statistics_update_pipeline(run_data.date, session_data.distance, session_data.duration, session_data.average_pace)
+    await db.statistics.update_one({"user_id": ObjectId(user_id)}, pipeline, upsert=True)
+    await record_daily_run(db, user_id, run_data.date, session_data.distance, session_data.duration)
+
+
+async def measure(name, finalize, args, body: RunningSessionCreate):
+    db = FakeDatabase(latency_ms=args.latency_ms)
+    user = await db.users.insert_one({"username": "bench"})
+    sessions = [{"start_time": datetime.now(timezone.utc), "status": "in_progress", "user_id": user.inserted_id} for _ in range(args.runs)]
+    session_ids = [str(i) for i in (await db.running_sessions.insert_many(sessions)).inserted_ids]
+    db.round_trips = 0
+
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(session_id):
+        async with semaphore:
+            started = time.perf_counter()
+            await finalize(session_id, body, db)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(session_id) for session_id in session_ids))
+    return {
+        "name": name,
+        "round_trips": db.round_trips / args.runs,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare run finalize latency before/after the round-trip reduction")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--route-points", type=int, default=1800)
+    args = parser.parse_args()
+
+    body = RunningSessionCreate(**end_body(args.route_points))
+    results = [
+        await measure("sequential (before)", legacy_end_running_session, args, body),
+        await measure("finalize (after)", end_running_session, args, body),
+    ]
+    print(f"latency per round trip: {args.latency_ms}ms")
+    print(f"{'flow':<22} {'round trips':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['name']:<22} {r['round_trips']:>12.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+    before, after = results[0]["p95_ms"], results[1]["p95_ms"]
+    print(f"p95 change: {(after - before) / before * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
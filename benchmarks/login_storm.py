@@ -0,0 +1,66 @@
+# 로그인 폭주 중 다른 엔드포인트(GET /)의 지연시간 측정
+# 실행 중인 서버 대상: python -m benchmarks.login_storm --base-url http://localhost:8000 --logins 200
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list, interval: float):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure unrelated-endpoint latency during a login storm")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    username, password = f"bench-{uuid.uuid4().hex[:8]}", "bench-password"
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        await client.post("/users/register", json={"username": username, "password": password})
+
+        baseline = []
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, baseline, args.probe_interval))
+        await asyncio.sleep(2)
+        stop.set()
+        await probe_task
+
+        during = []
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop, during, args.probe_interval))
+        semaphore = asyncio.Semaphore(args.concurrency)
+        login_latencies = []
+
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/users/login", json={"username": username, "password": password})
+                response.raise_for_status()
+                login_latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        stop.set()
+        await probe_task
+
+    for name, values in (("GET / idle", baseline), ("GET / during storm", during), ("POST /users/login", login_latencies)):
+        print(f"{name:<20} n={len(values):<5} p50={statistics.median(values):8.1f}ms p99={percentile(values, 99):8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+# 커넥션 풀 크기별 처리량 측정 (설정된 MONGODB_URL 대상, 읽기 전용)
+# 실행: python -m benchmarks.pool_size [--sizes 5,10,25,50,100] [--concurrency 200] [--seconds 10]
+import argparse
+import asyncio
+import time
+
+from database import DATABASE_NAME, create_client
+
+
+async def measure(pool_size: int, concurrency: int, seconds: float, profile: str):
+    client = create_client(profile, maxPoolSize=pool_size, minPoolSize=min(pool_size, 10))
+    db = client.get_database(DATABASE_NAME)
+    await client.admin.command("ping")
+    user = await db.users.find_one({}, {"_id": 1})
+    query = {"user_id": user["_id"]} if user else {}
+
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await db.statistics.find_one(query)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    client.close()
+    return done / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Throughput per Mongo connection pool size")
+    parser.add_argument("--sizes", default="5,10,25,50,100")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profile", default=None, help="Client profile to start from")
+    args = parser.parse_args()
+
+    print(f"{'pool':>6} {'ops/s':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        ops = await measure(size, args.concurrency, args.seconds, args.profile)
+        print(f"{size:>6} {ops:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
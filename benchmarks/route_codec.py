@@ -0,0 +1,42 @@
+# route_codec 크기 / 인코딩·디코딩 속도 벤치마크
+# 실행: python -m benchmarks.route_codec
+import math
+import random
+import timeit
+
+import bson
+
+from route_codec import encode_route, decode_route
+
+
+# 1Hz로 샘플링된 약 3m/s 러닝 경로 생성
+def make_route(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    lat, lng, alt = 37.5665, 126.9780, 30.0
+    heading = rng.uniform(0, 2 * math.pi)
+    start = 1_700_000_000.0
+    points = []
+    for i in range(n):
+        heading += rng.gauss(0, 0.15)
+        lat += 3.0 * math.cos(heading) / 111_320
+        lng += 3.0 * math.sin(heading) / (111_320 * math.cos(math.radians(lat)))
+        alt += rng.gauss(0, 0.2)
+        points.append({"lat": round(lat, 7), "lng": round(lng, 7), "t": start + i, "alt": round(alt, 2)})
+    return points
+
+
+def main():
+    print(f"{'points':>8} {'bson array':>12} {'encoded':>10} {'ratio':>7} {'encode ms':>10} {'decode ms':>10}")
+    for n in (600, 3600, 10800):
+        points = make_route(n)
+        encoded = encode_route(points)
+        array_size = len(bson.encode({"route": points}))
+        encoded_size = len(bson.encode({"route": encoded}))
+        repeat = 20
+        encode_ms = timeit.timeit(lambda: encode_route(points), number=repeat) / repeat * 1000
+        decode_ms = timeit.timeit(lambda: decode_route(encoded), number=repeat) / repeat * 1000
+        print(f"{n:>8} {array_size:>12} {encoded_size:>10} {array_size / encoded_size:>6.1f}x {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
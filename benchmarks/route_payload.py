@@ -0,0 +1,40 @@
+# /end 요청 본문 검증 비용 비교: 기존 list-of-dicts 형식 vs 컬럼 형식
+# 실행: python -m benchmarks.route_payload
+import json
+import timeit
+
+from benchmarks.route_codec import make_route
+from routes.running_sessions import RunningSessionCreate
+
+BASE = {"distance": 5.0, "duration": 1800, "average_pace": 6.0}
+
+
+def make_bodies(n: int):
+    points = make_route(n)
+    legacy = json.dumps({**BASE, "route": points})
+    columnar = json.dumps({
+        **BASE,
+        "lat": [p["lat"] for p in points],
+        "lng": [p["lng"] for p in points],
+        "t": [p["t"] for p in points],
+        "alt": [p["alt"] for p in points],
+    })
+    return legacy, columnar
+
+
+def run_case(body: str):
+    return RunningSessionCreate.model_validate_json(body).encoded_route()
+
+
+def main():
+    print(f"{'points':>8} {'legacy ms':>10} {'columnar ms':>12} {'speedup':>8}")
+    for n in (1_000, 10_000, 100_000):
+        legacy, columnar = make_bodies(n)
+        repeat = max(1, 20_000 // n)
+        legacy_ms = timeit.timeit(lambda: run_case(legacy), number=repeat) / repeat * 1000
+        columnar_ms = timeit.timeit(lambda: run_case(columnar), number=repeat) / repeat * 1000
+        print(f"{n:>8} {legacy_ms:>10.2f} {columnar_ms:>12.2f} {legacy_ms / columnar_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
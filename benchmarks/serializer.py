@@ -0,0 +1,63 @@
+# serializer.dumps vs jsonable_encoder + json.dumps 비교 (러닝 기록 / 코스 목록 응답)
+# 실행: python -m benchmarks.serializer
+import json
+import timeit
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.route_codec import make_route
+from route_codec import encode_route
+from serializer import dumps
+
+
+def make_run(points: int, encoded: bool):
+    route = make_route(points)
+    return {
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "date": datetime.now(timezone.utc),
+        "distance": 5.2,
+        "duration": 1800,
+        "average_pace": 5.8,
+        "strength": 5,
+        "route": encode_route(route) if encoded else route,
+        "course_id": None,
+        "metrics": {"distance_km": 5.21, "splits": [{"km": i, "distance_m": 1000.0, "duration_s": 330.0} for i in range(1, 6)]},
+    }
+
+
+def make_course(points: int):
+    route = make_route(points)
+    return {
+        "_id": ObjectId(),
+        "created_by": ObjectId(),
+        "route_coordinate": {"type": "LineString", "coordinates": [[p["lng"], p["lat"]] for p in route]},
+        "distance": 3.1,
+        "course_type": 1,
+        "recommendation_count": 12,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def legacy(docs):
+    return json.dumps(jsonable_encoder(docs, custom_encoder={ObjectId: str}), ensure_ascii=False).encode()
+
+
+def main():
+    cases = {
+        "20 runs x 1800 pts": ([make_run(1800, False) for _ in range(20)], [make_run(1800, True) for _ in range(20)]),
+        "100 runs x 300 pts": ([make_run(300, False) for _ in range(100)], [make_run(300, True) for _ in range(100)]),
+        "50 courses x 500 pts": ([make_course(500) for _ in range(50)],) * 2,
+    }
+    print(f"{'case':<22} {'jsonable_encoder ms':>20} {'serializer ms':>14} {'speedup':>8}")
+    for name, (plain_docs, stored_docs) in cases.items():
+        repeat = 5
+        legacy_ms = timeit.timeit(lambda: legacy(plain_docs), number=repeat) / repeat * 1000
+        fast_ms = timeit.timeit(lambda: dumps(stored_docs), number=repeat) / repeat * 1000
+        print(f"{name:<22} {legacy_ms:>20.1f} {fast_ms:>14.1f} {legacy_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from metrics import register_app_state
+from settings import settings
+
+# recommendation_count write-behind 버퍼
+# 선택/좋아요를 메모리에서 코스별로 합산하고 주기적으로 bulk_write($inc) 한 번에 반영
+# 유실 범위: 최대 flush 간격만큼의 증가분 (정상 종료 시에는 shutdown에서 마지막으로 flush)
+
+logger = logging.getLogger("runaway.counters")
+
+class RecommendationCounter:
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = defaultdict(int)
+        self.pending_increments = 0
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.early_flush = None  # 버퍼가 가득 차서 시작한 flush (이벤트 루프는 약한 참조만 가지므로 보관)
+        self.get_db = None
+        self.flushes = 0
+        self.flushed_increments = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def record(self, course_id: ObjectId, amount: int = 1):
+        self.pending[course_id] += amount
+        self.pending_increments += amount
+        # 버퍼가 너무 커지면 주기를 기다리지 않고 바로 flush
+        if self.pending_increments >= self.max_pending and self.get_db is not None and not self.lock.locked():
+            if self.early_flush is None or self.early_flush.done():
+                self.early_flush = asyncio.get_running_loop().create_task(self._flush_logged())
+
+    async def _flush_logged(self):
+        try:
+            await self.flush(self.get_db())
+        except Exception:
+            logger.exception("Failed to flush recommendation counts")
+
+    async def flush(self, db):
+        async with self.lock:
+            if not self.pending or db is None:
+                return
+            batch, self.pending = self.pending, defaultdict(int)
+            increments, self.pending_increments = self.pending_increments, 0
+            operations = [UpdateOne({"_id": course_id}, {"$inc": {"recommendation_count": amount}}) for course_id, amount in batch.items()]
+            started = time.perf_counter()
+            try:
+                await db.courses.bulk_write(operations, ordered=False)
+            except Exception:
+                # 실패한 증가분은 버퍼로 되돌려 다음 주기에 다시 시도
+                self.failures += 1
+                for course_id, amount in batch.items():
+                    self.pending[course_id] += amount
+                self.pending_increments += increments
+                raise
+            finally:
+                self.last_flush_ms = (time.perf_counter() - started) * 1000
+                self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            self.flushes += 1
+            self.flushed_increments += increments
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_logged()
+
+    def start(self, get_db):
+        self.get_db = get_db
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, db):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.early_flush is not None:
+            await self.early_flush
+            self.early_flush = None
+        await self.flush(db)
+
+    def stats(self):
+        return {
+            "buffer_depth": len(self.pending),
+            "pending_increments": self.pending_increments,
+            "flushes": self.flushes,
+            "flushed_increments": self.flushed_increments,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "flush_interval_s": self.flush_interval,
+        }
+
+
+recommendation_counter = RecommendationCounter(settings.RECOMMENDATION_FLUSH_INTERVAL_S, settings.RECOMMENDATION_MAX_PENDING)
+register_app_state("recommendation_counter", recommendation_counter.stats)
@@ -0,0 +1,51 @@
+import hashlib
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+# 코스 이미지는 courses 문서에 넣지 않고 GridFS(course_images 버킷)에 저장, 문서에는 image_id만 보관
+IMAGE_BUCKET = "course_images"
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"  # 이미지는 생성 후 바뀌지 않음
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+)
+
+
+def image_bucket(db) -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name=IMAGE_BUCKET)
+
+
+def image_content_type(data: bytes) -> str:
+    for signature, content_type in _SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    return "application/octet-stream"
+
+
+def image_etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+async def store_course_image(db, data: bytes, course_id: ObjectId):
+    etag = image_etag(data)
+    image_id = await image_bucket(db).upload_from_stream(
+        f"{course_id}",
+        data,
+        metadata={"course_id": course_id, "content_type": image_content_type(data), "etag": etag}
+    )
+    return image_id, etag
+
+
+# If-None-Match 헤더에 현재 ETag가 포함되어 있는지 (약한 비교)
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
@@ -1,18 +1,87 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import SecondaryPreferred
 from settings import settings
+from metrics import MongoCommandMetrics, MongoPoolMetrics
+
+DATABASE_NAME = "RunawayCluster"
 
 # 클라이언트를 글로벌로 유지하여 재사용
 client = None
 
+# Mongo 클라이언트 프로필 (MONGO_CLIENT_PROFILE). MONGO_* 개별 설정이 있으면 그 값이 우선
+# 압축: 경로 데이터는 압축률이 높음. zstd/snappy는 zstandard/python-snappy가 설치되어 있을 때만 사용되고 없으면 pymongo가 건너뜀
+CLIENT_PROFILES = {
+    "default": {
+        "maxPoolSize": 100,
+        "minPoolSize": 0,
+        "maxIdleTimeMS": 60000,
+        "connectTimeoutMS": 10000,
+        "serverSelectionTimeoutMS": 10000,
+        "compressors": "zstd,snappy,zlib",
+    },
+    # 모바일 API 워커: 커넥션을 미리 열어 두고, 풀이 막히면 오래 기다리지 않고 실패
+    "api": {
+        "maxPoolSize": 50,
+        "minPoolSize": 10,
+        "maxIdleTimeMS": 300000,
+        "connectTimeoutMS": 5000,
+        "serverSelectionTimeoutMS": 5000,
+        "socketTimeoutMS": 15000,
+        "waitQueueTimeoutMS": 2000,
+        "compressors": "zstd,snappy,zlib",
+    },
+    # 마이그레이션/백필 스크립트: 적은 커넥션, 긴 명령 허용
+    "batch": {
+        "maxPoolSize": 10,
+        "minPoolSize": 0,
+        "connectTimeoutMS": 20000,
+        "serverSelectionTimeoutMS": 30000,
+        "socketTimeoutMS": 0,
+        "compressors": "zstd,zlib",
+    },
+}
+
+_OVERRIDES = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "compressors": "MONGO_COMPRESSORS",
+}
+
+
+def client_options(profile: str = None, **overrides):
+    profile = profile or settings.MONGO_CLIENT_PROFILE
+    if profile not in CLIENT_PROFILES:
+        raise ValueError(f"Unknown MONGO_CLIENT_PROFILE: {profile}")
+    options = dict(CLIENT_PROFILES[profile])
+    for option, setting in _OVERRIDES.items():
+        value = getattr(settings, setting)
+        if value is not None:
+            options[option] = value
+    options.update(overrides)
+    return options
+
+
+def create_client(profile: str = None, **overrides):
+    return AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        tls=True,
+        tlsAllowInvalidCertificates=True,
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()],
+        **client_options(profile, **overrides)
+    )
+
 async def connect_to_mongo():
     global client
     if client is None:
-        client = AsyncIOMotorClient(settings.MONGODB_URL, tls=True, tlsAllowInvalidCertificates=True)
+        client = create_client()
         await client.server_info()  # 연결 확인
         print("Successfully connected to MongoDB")
-        # 인덱스 생성
-        db = client.get_database("RunawayCluster")
-        await db.courses.create_index([("route_coordinate", "2dsphere")])
+        # 인덱스는 indexes.py 레지스트리 -> python -m scripts.sync_indexes 로 생성
 
 async def close_mongo_connection():
     global client
@@ -23,4 +92,12 @@ async def close_mongo_connection():
 
 def get_database():
     global client
-    return client.get_database("RunawayCluster") if client else None
+    return client.get_database(DATABASE_NAME) if client else None
+
+# 통계/코스 목록처럼 약간 늦은 데이터를 허용하는 읽기 전용 엔드포인트용 (세컨더리 우선)
+def get_analytics_database():
+    global client
+    if not client:
+        return None
+    read_preference = SecondaryPreferred(max_staleness=settings.MONGO_ANALYTICS_MAX_STALENESS_S)
+    return client.get_database(DATABASE_NAME, read_preference=read_preference)
@@ -0,0 +1,224 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from metrics import register_app_state
+from settings import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis는 COURSE_CACHE_BACKEND=redis 일 때만 필요
+    redis_asyncio = None
+
+# 코스 추천 결과 캐시
+# - 결과 키: (정렬, 요청 위치의 geohash 셀, 반경, limit, cursor, 무효화 세대)
+# - 무효화: 코스가 생기면 경로가 지나는 셀과 이웃 셀의 "세대"를 모든 정밀도에서 올림
+#   요청 반경보다 큰 셀 정밀도의 세대를 키에 넣기 때문에, 반경 안에 새 코스가 생기면 항상 다른 키가 됨
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 9
+
+
+def geohash_encode(lat: float, lng: float, precision: int) -> str:
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    out = []
+    ch = bit = 0
+    even = True
+    while len(out) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch |= 1 << (4 - bit)
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            out.append(_BASE32[ch])
+            ch = bit = 0
+    return "".join(out)
+
+
+# precision 셀의 (위도 높이, 경도 폭) (단위: 도)
+def cell_size_deg(precision: int):
+    bits = precision * 5
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+# 자기 자신 포함 3x3 셀
+def geohash_neighbours(lat: float, lng: float, precision: int):
+    height, width = cell_size_deg(precision)
+    cells = set()
+    for dlat in (-height, 0, height):
+        for dlng in (-width, 0, width):
+            nlat = max(-89.999999, min(89.999999, lat + dlat))
+            nlng = (lng + dlng + 180) % 360 - 180
+            cells.add(geohash_encode(nlat, nlng, precision))
+    return cells
+
+
+# 경로 [(lng, lat), ...]가 지나는 precision 셀과 그 이웃 셀
+# 셀보다 긴 구간은 셀 크기 간격으로 나눠서 구간 중간에 걸치는 셀도 포함
+def route_cells(points, precision: int):
+    step = min(cell_size_deg(precision))
+    cells = set()
+    for i, (lng, lat) in enumerate(points):
+        next_lng, next_lat = points[i + 1] if i + 1 < len(points) else (lng, lat)
+        samples = max(1, math.ceil(max(abs(next_lat - lat), abs(next_lng - lng)) / step))
+        for j in range(samples):
+            f = j / samples
+            cells.update(geohash_neighbours(lat + (next_lat - lat) * f, lng + (next_lng - lng) * f, precision))
+    return cells
+
+
+# 셀 크기가 반경 이상인 가장 세밀한 정밀도 -> 반경 안의 코스는 항상 같은 셀 또는 이웃 셀에 있음
+def invalidation_precision(lat: float, radius_m: float) -> int:
+    meters_per_deg = 111_320.0
+    for precision in range(MAX_PRECISION, 0, -1):
+        height, width = cell_size_deg(precision)
+        if min(height * meters_per_deg, width * meters_per_deg * math.cos(math.radians(min(abs(lat), 85.0)))) >= radius_m:
+            return precision
+    return 1
+
+
+# 캐시 저장소 인터페이스 (메모리 / Redis)
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    async def get_generation(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    async def bump_generations(self, keys, ttl: float):
+        ...
+
+
+# 워커 프로세스 내부 LRU + TTL
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}  # LRU로 밀려나면 안 되므로 따로 보관 (TTL로만 정리)
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_generation(self, key):
+        entry = self.generations.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return "0"
+        return entry[0]
+
+    async def bump_generations(self, keys, ttl):
+        now = time.monotonic()
+        self.generations = {k: v for k, v in self.generations.items() if v[1] >= now}
+        generation = str(time.time_ns())
+        for key in keys:
+            self.generations[key] = (generation, now + ttl)
+
+
+# 여러 uvicorn 워커가 공유하는 Redis 호환 백엔드 (maxmemory-policy allkeys-lru 권장)
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("COURSE_CACHE_BACKEND=redis requires the 'redis' package")
+        self.client = redis_asyncio.from_url(url)
+
+    async def get(self, key):
+        return await self.client.get(key)
+
+    async def set(self, key, value, ttl):
+        await self.client.set(key, value, ex=max(1, int(ttl)))
+
+    async def get_generation(self, key):
+        value = await self.client.get(key)
+        return value.decode() if value else "0"
+
+    async def bump_generations(self, keys, ttl):
+        generation = str(time.time_ns())
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, generation, ex=max(1, int(ttl)))
+            await pipe.execute()
+
+
+class GeoCourseCache:
+    def __init__(self, backend: CacheBackend, ttl: float, precision: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def lookup(self, latitude: float, longitude: float, sort: str, radius: int, limit: int, cursor: Optional[str]):
+        gen_precision = min(self.precision, invalidation_precision(latitude, radius))
+        generation = await self.backend.get_generation(f"courses:gen:{geohash_encode(latitude, longitude, gen_precision)}")
+        cell = geohash_encode(latitude, longitude, self.precision)
+        key = f"courses:{sort}:{cell}:{radius}:{limit}:{cursor or ''}:{generation}"
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, value
+
+    async def store(self, key: str, value: bytes):
+        await self.backend.set(key, value, self.ttl)
+
+    async def invalidate(self, latitude: float, longitude: float):
+        await self.invalidate_route([(longitude, latitude)])
+
+    async def invalidate_route(self, points):
+        keys = set()
+        for precision in range(1, self.precision + 1):
+            keys.update(f"courses:gen:{cell}" for cell in route_cells(points, precision))
+        # 세대 키는 결과 TTL 동안만 유지되면 충분 (그보다 오래된 결과는 이미 만료)
+        await self.backend.bump_generations(keys, self.ttl + 1)
+        self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def build_course_cache() -> GeoCourseCache:
+    if settings.COURSE_CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(settings.COURSE_CACHE_REDIS_URL)
+    else:
+        backend = MemoryCacheBackend(settings.COURSE_CACHE_MAX_ENTRIES)
+    return GeoCourseCache(backend, settings.COURSE_CACHE_TTL_S, settings.COURSE_CACHE_PRECISION)
+
+
+course_cache = build_course_cache()
+register_app_state("course_cache", lambda: course_cache.stats())
@@ -0,0 +1,105 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+# 인덱스 레지스트리
+# 각 라우터 모듈이 쿼리 옆에서 require_index()로 필요한 인덱스와 대표 쿼리를 선언하고,
+# 실제 생성/정리는 워커 시작 시점이 아니라 `python -m scripts.sync_indexes`에서 한다
+# 단, 유니크 인덱스는 upsert 중복 방지에 필요하므로 API/작업 워커 시작 시 ensure_unique_indexes로 만들어 둠
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, Any]]
+    unique: bool = False
+    query: Optional[Dict[str, Any]] = None  # explain으로 COLLSCAN 여부를 확인할 대표 쿼리
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+INDEXES: List[IndexSpec] = []
+
+
+def require_index(collection: str, keys, *, unique: bool = False, query=None, sort=None) -> IndexSpec:
+    spec = IndexSpec(collection, list(keys), unique, query, sort)
+    INDEXES.append(spec)
+    return spec
+
+
+def index_name(keys) -> str:
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+# 선언은 라우터 모듈을 import할 때 등록됨
+def load_declarations() -> List[IndexSpec]:
+    import routes  # noqa: F401
+    return INDEXES
+
+
+# 선언된 인덱스 생성, 선언되지 않은 인덱스는 보고(drop_unknown이면 삭제)
+async def sync_indexes(db, drop_unknown: bool = False, dry_run: bool = False):
+    report = {"created": [], "existing": [], "unknown": [], "dropped": []}
+    by_collection = {}
+    for spec in load_declarations():
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection, specs in by_collection.items():
+        existing = await db[collection].index_information()
+        declared = set()
+        for spec in specs:
+            name = index_name(spec.keys)
+            declared.add(name)
+            if name in existing:
+                report["existing"].append(f"{collection}.{name}")
+                continue
+            if not dry_run:
+                await db[collection].create_index(spec.keys, name=name, unique=spec.unique)
+            report["created"].append(f"{collection}.{name}")
+        for name in existing:
+            if name == "_id_" or name in declared:
+                continue
+            report["unknown"].append(f"{collection}.{name}")
+            if drop_unknown and not dry_run:
+                await db[collection].drop_index(name)
+                report["dropped"].append(f"{collection}.{name}")
+    return report
+
+
+logger = logging.getLogger("runaway.indexes")
+
+
+# 선언된 유니크 인덱스만 생성 (이미 있으면 그대로)
+# 기존 중복 문서 때문에 만들 수 없으면 에러만 남기고 계속 (서버는 뜨고, 중복 정리 후 다시 시작하면 생성됨)
+async def ensure_unique_indexes(db):
+    for spec in load_declarations():
+        if not spec.unique:
+            continue
+        try:
+            await db[spec.collection].create_index(spec.keys, name=index_name(spec.keys), unique=True)
+        except OperationFailure:
+            logger.exception("Failed to create unique index %s.%s", spec.collection, index_name(spec.keys))
+
+
+def _plan_stages(plan: Dict[str, Any]):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+# 대표 쿼리를 explain해서 COLLSCAN을 쓰는 것들을 반환
+async def check_query_plans(db):
+    failures = []
+    for spec in load_declarations():
+        if spec.query is None:
+            continue
+        command = {"find": spec.collection, "filter": spec.query}
+        if spec.sort:
+            command["sort"] = dict(spec.sort)
+        explain = await db.command("explain", command, verbosity="queryPlanner")
+        stages = set(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append(f"{spec.collection} {spec.query} sort={spec.sort}: COLLSCAN")
+    return failures
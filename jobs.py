@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from indexes import require_index
+from metrics import JOB_LAG, JOB_LATENCY, JOB_QUEUE_DEPTH, register_app_state
+from settings import settings
+
+# Mongo 기반 작업 큐 (jobs 컬렉션)
+# { _id, type, payload, status(pending|running|failed), attempts, max_attempts,
+#   run_at(이 시각 이후 실행), lease_until(running 작업의 점유 만료), lease_id(claim마다 새로 발급), worker, last_error, created_at, finished_at }
+# - claim: pending이고 run_at이 지난 작업 하나를 find_one_and_update로 running으로 바꾸며 가져감
+# - 실행 중에는 lease_until을 주기적으로 연장, 완료/실패 기록은 같은 lease_id일 때만 반영
+# - 워커가 죽어 lease가 만료된 running 작업은 다른 워커가 다시 가져감 (attempts가 max_attempts에 닿았으면 failed)
+#   -> 핸들러는 여러 번 실행돼도 안전해야 함
+# - 성공한 작업은 삭제 (컬렉션에는 대기/실행 중/최종 실패한 작업만 남음)
+# - 실패하면 attempts에 따라 지수 백오프로 run_at을 미루고, max_attempts를 넘으면 failed로 남김
+
+PENDING, RUNNING, FAILED = "pending", "running", "failed"
+
+logger = logging.getLogger("runaway.jobs")
+
+# 실행할 작업 조회 (run_at 순)
+require_index("jobs", [("status", 1), ("run_at", 1)], query={"status": PENDING, "run_at": {"$lte": datetime(2024, 1, 1)}}, sort=[("run_at", 1)])
+# lease 만료된 작업 회수
+require_index("jobs", [("status", 1), ("lease_until", 1)], query={"status": RUNNING, "lease_until": {"$lt": datetime(2024, 1, 1)}})
+JobHandler = Callable[[Any, Dict[str, Any]], Awaitable[None]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def job_handler(job_type: str):
+    def register(func: JobHandler):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return register
+
+
+# 핸들러는 라우터 모듈에 선언되어 있으므로 워커 프로세스에서는 import로 등록
+def load_handlers() -> Dict[str, JobHandler]:
+    import routes  # noqa: F401
+    return JOB_HANDLERS
+
+
+async def enqueue(db, job_type: str, payload: Dict[str, Any], delay: float = 0, max_attempts: Optional[int] = None) -> ObjectId:
+    now = datetime.now(timezone.utc)
+    job = {
+        "type": job_type,
+        "payload": payload,
+        "status": PENDING,
+        "attempts": 0,
+        "max_attempts": max_attempts or settings.JOB_MAX_ATTEMPTS,
+        "run_at": now + timedelta(seconds=delay),
+        "created_at": now,
+    }
+    result = await db.jobs.insert_one(job)
+    return result.inserted_id
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(settings.JOB_RETRY_BASE_S * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_S)
+    return delay * random.uniform(0.5, 1.0)  # 동시에 실패한 작업들이 같은 시각에 몰리지 않도록
+
+
+async def claim(db, worker_id: str):
+    now = datetime.now(timezone.utc)
+    update = {
+        "$set": {
+            "status": RUNNING,
+            "lease_until": now + timedelta(seconds=settings.JOB_LEASE_S),
+            "lease_id": ObjectId(),
+            "worker": worker_id,
+        },
+        "$inc": {"attempts": 1},
+    }
+    job = await db.jobs.find_one_and_update(
+        {"status": PENDING, "run_at": {"$lte": now}}, update,
+        sort=[("run_at", 1)], return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        # 재시도 횟수가 남은 작업만 회수 (나머지는 fail_expired가 failed로 정리)
+        job = await db.jobs.find_one_and_update(
+            {"status": RUNNING, "lease_until": {"$lt": now}, "$expr": {"$lt": ["$attempts", "$max_attempts"]}}, update,
+            return_document=ReturnDocument.AFTER
+        )
+    return job
+
+
+# lease가 만료됐고 재시도 횟수도 다 쓴 작업(실행 중 워커가 계속 죽는 작업)은 회수하지 않고 failed로
+async def fail_expired(db) -> int:
+    now = datetime.now(timezone.utc)
+    result = await db.jobs.update_many(
+        {"status": RUNNING, "lease_until": {"$lt": now}, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+        {"$set": {"status": FAILED, "finished_at": now, "last_error": "Lease expired on the last attempt"},
+         "$unset": {"lease_until": "", "lease_id": ""}}
+    )
+    return result.modified_count
+
+
+# 아래 갱신은 이번 claim의 lease를 가진 워커일 때만 반영 (lease가 만료돼 다른 워커가 가져간 작업은 건드리지 않음)
+def _lease_filter(job):
+    return {"_id": job["_id"], "lease_id": job["lease_id"], "status": RUNNING}
+
+
+async def extend_lease(db, job) -> bool:
+    result = await db.jobs.update_one(
+        _lease_filter(job),
+        {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_LEASE_S)}}
+    )
+    return result.matched_count == 1
+
+
+async def complete(db, job):
+    await db.jobs.delete_one(_lease_filter(job))
+
+
+async def fail(db, job, error: str) -> bool:
+    now = datetime.now(timezone.utc)
+    retry = job["attempts"] < job.get("max_attempts", settings.JOB_MAX_ATTEMPTS)
+    update = {"last_error": error[:1000]}
+    if retry:
+        update.update(status=PENDING, run_at=now + timedelta(seconds=retry_delay(job["attempts"])))
+    else:
+        update.update(status=FAILED, finished_at=now)
+    await db.jobs.update_one(
+        _lease_filter(job),
+        {"$set": update, "$unset": {"lease_until": "", "lease_id": ""}}
+    )
+    return retry
+
+
+# 상태/타입별 작업 수와 가장 오래 기다린 pending 작업의 대기 시간
+async def queue_stats(db):
+    rows = await db.jobs.aggregate([
+        {"$match": {"status": {"$in": [PENDING, RUNNING, FAILED]}}},
+        {"$group": {"_id": {"type": "$type", "status": "$status"}, "count": {"$sum": 1}, "oldest": {"$min": "$run_at"}}}
+    ]).to_list(length=None)
+    now = datetime.now(timezone.utc)
+    stats = {}
+    for row in rows:
+        job_type, status = row["_id"]["type"], row["_id"]["status"]
+        entry = stats.setdefault(job_type, {PENDING: 0, RUNNING: 0, FAILED: 0, "lag_s": 0.0})
+        entry[status] = row["count"]
+        if status == PENDING and row["oldest"] is not None:
+            oldest = row["oldest"] if row["oldest"].tzinfo else row["oldest"].replace(tzinfo=timezone.utc)
+            entry["lag_s"] = max(0.0, (now - oldest).total_seconds())
+    return stats
+
+
+class JobWorkerPool:
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.tasks = []
+        self.get_db = None
+        self.wakeup = asyncio.Event()
+        self.running = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.unknown_types = 0
+
+    def notify(self):
+        # 같은 프로세스에서 enqueue한 작업은 폴링 주기를 기다리지 않고 바로 처리
+        self.wakeup.set()
+
+    # 핸들러가 도는 동안 lease_until을 연장 (오래 걸리는 작업을 다른 워커가 중복 실행하지 않도록)
+    async def _keep_lease(self, db, job):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_S / 3)
+            try:
+                if not await extend_lease(db, job):
+                    return  # 이미 다른 워커가 가져감
+            except Exception:
+                logger.exception("Failed to extend lease of job %s", job["_id"])
+
+    async def run_one(self, db, job):
+        handler = JOB_HANDLERS.get(job["type"])
+        claimed_at = datetime.now(timezone.utc)
+        run_at = job["run_at"] if job["run_at"].tzinfo else job["run_at"].replace(tzinfo=timezone.utc)
+        JOB_LAG.labels(job["type"]).observe(max(0.0, (claimed_at - run_at).total_seconds()))
+
+        started = time.perf_counter()
+        outcome = "error"
+        self.running += 1
+        heartbeat = asyncio.create_task(self._keep_lease(db, job))
+        try:
+            if handler is None:
+                self.unknown_types += 1
+                raise LookupError(f"No handler registered for job type {job['type']!r}")
+            await handler(db, job["payload"])
+        except Exception as e:
+            outcome = "retry" if await fail(db, job, f"{type(e).__name__}: {e}") else "failed"
+            if outcome == "retry":
+                self.retried += 1
+            else:
+                self.failed += 1
+                logger.error("Job %s (%s) failed permanently: %s", job["_id"], job["type"], e)
+        else:
+            await complete(db, job)
+            outcome = "done"
+            self.succeeded += 1
+        finally:
+            heartbeat.cancel()
+            self.running -= 1
+            JOB_LATENCY.labels(job["type"], outcome).observe(time.perf_counter() - started)
+
+    async def _worker(self):
+        while True:
+            db = self.get_db()
+            job = None
+            try:
+                job = await claim(db, self.worker_id) if db is not None else None
+            except Exception:
+                logger.exception("Failed to claim job")
+            if job is None:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.run_one(db, job)
+            except Exception:
+                logger.exception("Failed to record result of job %s", job["_id"])
+
+    async def _report(self):
+        while True:
+            db = self.get_db()
+            if db is not None:
+                try:
+                    await fail_expired(db)
+                    stats = await queue_stats(db)
+                    JOB_QUEUE_DEPTH.clear()  # 비워진 타입은 0으로 보이도록 다시 채움
+                    for job_type, entry in stats.items():
+                        for status in (PENDING, RUNNING, FAILED):
+                            JOB_QUEUE_DEPTH.labels(job_type, status).set(entry[status])
+                except Exception:
+                    logger.exception("Failed to collect job queue stats")
+            await asyncio.sleep(settings.JOB_METRICS_INTERVAL_S)
+
+    def start(self, get_db):
+        self.get_db = get_db
+        if not self.tasks and self.concurrency > 0:
+            loop = asyncio.get_running_loop()
+            self.tasks = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+            self.tasks.append(loop.create_task(self._report()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.tasks = []
+
+    def stats(self):
+        return {
+            "workers": self.concurrency if self.tasks else 0,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "unknown_types": self.unknown_types,
+        }
+
+
+job_workers = JobWorkerPool(settings.JOB_WORKERS_IN_PROCESS, settings.JOB_POLL_INTERVAL_S)
+register_app_state("job_workers", job_workers.stats)
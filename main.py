@@ -1,17 +1,27 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from routes import users, running_sessions, courses, stats
-from database import connect_to_mongo, close_mongo_connection
+from database import connect_to_mongo, close_mongo_connection, get_database
+from indexes import ensure_unique_indexes
+from course_counters import recommendation_counter
+from jobs import job_workers
+from metrics import MetricsMiddleware, metrics_response_body
 from settings import settings
 
 app = FastAPI(title="Runaway API")
+app.add_middleware(MetricsMiddleware)
 
 # 데이터베이스 연결 이벤트 핸들러
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    await ensure_unique_indexes(get_database())  # upsert 중복 방지에 필요한 유니크 인덱스
+    recommendation_counter.start(get_database)
+    job_workers.start(get_database)  # 런 후처리 등 작업 큐 (JOB_WORKERS_IN_PROCESS=0이면 별도 워커 프로세스가 처리)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await recommendation_counter.stop(get_database())  # 남은 recommendation_count 증가분 반영
+    await job_workers.stop()  # 처리 중이던 작업은 lease 만료 후 다른 워커가 다시 가져감
     await close_mongo_connection()
 
 # 라우터 등록
@@ -20,6 +30,12 @@ app.include_router(running_sessions.router, prefix="/running_sessions", tags=["r
 app.include_router(courses.router, prefix="/courses", tags=["courses"])
 app.include_router(stats.router, prefix="/stats", tags=["stats"])
 
+# Prometheus 지표
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = metrics_response_body()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Runaway API"}
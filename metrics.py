@@ -0,0 +1,160 @@
+import logging
+import time
+from contextvars import ContextVar
+
+import bson
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+from starlette.routing import Match
+
+from settings import settings
+
+# Prometheus 지표
+# - 요청 지연시간 (ASGI 미들웨어)
+# - Mongo 명령별/컬렉션별 지연시간, 응답 크기, 커넥션 풀 대기시간 (pymongo 이벤트 리스너)
+# Mongo 지표에는 해당 명령을 실행한 FastAPI 라우트 경로가 route 라벨로 붙는다
+
+logger = logging.getLogger("runaway.mongo")
+
+# 현재 요청의 라우트 경로 (Motor는 executor 스레드로 contextvars를 복사하므로 리스너에서 읽을 수 있음)
+current_route: ContextVar[str] = ContextVar("current_route", default="-")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ["command", "collection", "route"]
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ["command", "collection", "route"]
+)
+MONGO_REPLY_BYTES = Histogram(
+    "mongo_reply_bytes", "Size of MongoDB command replies", ["command", "collection", "route"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+MONGO_POOL_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting to check out a pooled connection", ["route"]
+)
+JOB_LATENCY = Histogram(
+    "job_duration_seconds", "Background job run time", ["type", "outcome"]
+)
+JOB_LAG = Histogram(
+    "job_lag_seconds", "Delay between a job becoming runnable and a worker claiming it", ["type"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth", "Jobs per type and status", ["type", "status"]
+)
+
+# 명령 이름 -> 컬렉션 이름이 들어 있는 필드
+_COLLECTION_FIELDS = {"getMore": "collection"}
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self.pending = {}
+
+    def started(self, event):
+        field = _COLLECTION_FIELDS.get(event.command_name, event.command_name)
+        collection = event.command.get(field)
+        self.pending[(event.request_id, event.connection_id)] = collection if isinstance(collection, str) else "-"
+
+    def _finish(self, event):
+        return self.pending.pop((event.request_id, event.connection_id), "-"), current_route.get()
+
+    def succeeded(self, event):
+        collection, route = self._finish(event)
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_LATENCY.labels(event.command_name, collection, route).observe(seconds)
+        if settings.METRICS_REPLY_BYTES:
+            MONGO_REPLY_BYTES.labels(event.command_name, collection, route).observe(len(bson.encode(event.reply)))
+        if seconds * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning("slow mongo command: %s %s %.1fms route=%s", event.command_name, collection, seconds * 1000, route)
+
+    def failed(self, event):
+        collection, route = self._finish(event)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection, route).inc()
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def connection_checked_out(self, event):
+        duration = getattr(event, "duration", None)  # pymongo 4.7+
+        if duration is not None:
+            MONGO_POOL_WAIT.labels(current_route.get()).observe(duration)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+def _route_path(scope) -> str:
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+# 요청 지연시간 기록 + Mongo 리스너가 쓸 라우트 경로 설정
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = _route_path(scope)
+        token = current_route.set(route)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
+            current_route.reset(token)
+
+
+# 인메모리 캐시/버퍼 상태를 scrape 시점에 Gauge로 노출
+# 각 모듈이 register_app_state로 stats 함수를 등록 (database가 metrics를 import하므로 여기서 앱 모듈을 import하지 않음)
+APP_STATE_SOURCES = {}
+
+
+def register_app_state(prefix: str, stats):
+    APP_STATE_SOURCES[prefix] = stats
+
+
+class AppStateCollector:
+    # describe가 있으면 REGISTRY.register가 등록 시점에 collect()를 호출하지 않음
+    def describe(self):
+        return []
+
+    def collect(self):
+        for prefix, source in list(APP_STATE_SOURCES.items()):
+            for key, value in source().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield GaugeMetricFamily(f"runaway_{prefix}_{key}", f"{prefix} {key}", value=value)
+
+
+REGISTRY.register(AppStateCollector())
+
+
+def metrics_response_body():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,7 +1,7 @@
 from bson import ObjectId
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from bson.binary import Binary
 
 
@@ -32,6 +32,13 @@ class User(BaseModel):
     recent_runs: Optional[List[Dict[str, Any]]] = None
     refresh_token: Optional[str] = None
 
+    # recent_runs 요약은 ObjectId(_id, course_id)를 그대로 담고 있어 Any로는 직렬화되지 않으므로 문자열로
+    @field_serializer("recent_runs")
+    def serialize_recent_runs(self, recent_runs):
+        if recent_runs is None:
+            return None
+        return [{key: str(value) if isinstance(value, ObjectId) else value for key, value in run.items()} for run in recent_runs]
+
     class Config:
         populate_by_name = True
         arbitrary_types_allowed = True
@@ -48,7 +55,9 @@ class Run(BaseModel):
     duration: int
     average_pace: float
     strength: Optional[int] = 5
-    route: Optional[List[Dict[str, Any]]]
+    route: Optional[Union[Binary, List[Dict[str, Any]]]]  # route_codec으로 압축된 Binary 또는 포인트 리스트 (지도 표시용 단순화 경로)
+    raw_route: Optional[Union[Binary, List[Dict[str, Any]]]] = None  # 단순화 전 원본 경로
+    metrics: Optional[Dict[str, Any]] = None  # 서버 계산 거리/이동 시간/페이스/km 스플릿 (route_metrics)
     course_id: Optional[PyObjectId] = None
 
     class Config:
@@ -62,7 +71,9 @@ class Run(BaseModel):
 class Course(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     created_by: Optional[PyObjectId] = None
-    route: Binary
+    route: Optional[Binary] = None  # 마이그레이션 전 코스의 이미지 (신규 코스는 image_id 사용)
+    image_id: Optional[PyObjectId] = None  # GridFS course_images 파일 id
+    image_etag: Optional[str] = None
     route_coordinate: Dict[str, Any]
     distance: float
     course_type: Optional[int] = 0 #0이면 직접그리기, 1이면 추천
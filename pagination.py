@@ -0,0 +1,50 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+
+# 키셋(커서) 페이지네이션: (정렬 필드, _id) 내림차순
+# next 토큰은 마지막 문서의 (정렬 값, _id)를 Extended JSON + base64url로 감싼 불투명 문자열
+
+# 커서의 정렬 값으로 허용하는 타입 (dict/list가 들어오면 쿼리 연산자가 주입될 수 있음)
+# None은 정렬 필드가 없는 문서에서 나온 커서
+CURSOR_VALUE_TYPES = (datetime, int, float, ObjectId, type(None))
+
+
+def encode_cursor(value: Any, _id: Any) -> str:
+    raw = json_util.dumps({"v": value, "id": _id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json_util.loads(raw)
+        value, _id = data["v"], data["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES) or not isinstance(_id, ObjectId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, _id
+
+
+# 커서 이후(더 오래된/더 작은) 문서만 고르는 조건
+def keyset_filter(field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    if not cursor:
+        return {}
+    value, _id = decode_cursor(cursor)
+    return {"$or": [{field: {"$lt": value}}, {field: value, "_id": {"$lt": _id}}]}
+
+
+def keyset_sort(field: str):
+    return [(field, -1), ("_id", -1)]
+
+
+# limit + 1개를 조회해서 다음 페이지 존재 여부 판단
+def page(docs: List[Dict[str, Any]], field: str, limit: int):
+    items = docs[:limit]
+    next_cursor = encode_cursor(items[-1].get(field), items[-1]["_id"]) if len(docs) > limit else None
+    return items, next_cursor
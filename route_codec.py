@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+from bson.binary import Binary
+
+# GPS 경로 압축 포맷
+# [헤더] MAGIC(3) + VERSION(1) + FLAGS(1) + 포인트 개수(varint)
+# [본문] lat, lng, (t), (alt) 컬럼 순서로 이전 값과의 차이를 zigzag varint로 기록 (polyline 방식)
+ROUTE_MAGIC = b"RWR"
+ROUTE_VERSION = 1
+ROUTE_BINARY_SUBTYPE = 0x80  # 사용자 정의 subtype -> 코스 이미지(Binary subtype 0)와 구분
+
+FLAG_HAS_T = 0x01
+FLAG_HAS_ALT = 0x02
+
+LAT_LNG_SCALE = 1e6  # 약 0.1m 정밀도
+T_SCALE = 1e3  # 밀리초
+ALT_SCALE = 1e1  # 0.1m
+
+ROUTE_FIELDS = ("lat", "lng", "t", "alt")
+
+
+class RouteColumns(NamedTuple):
+    lat: List[float]
+    lng: List[float]
+    t: Optional[List[float]] = None
+    alt: Optional[List[float]] = None
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_deltas(out: bytearray, values: List[float], scale: float):
+    prev = 0
+    for v in values:
+        cur = int(round(v * scale))
+        delta = cur - prev
+        prev = cur
+        _write_varint(out, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+
+
+def _read_varint(data: bytes, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_deltas(data: bytes, pos: int, count: int, scale: float):
+    values = []
+    append = values.append
+    cur = 0
+    for _ in range(count):
+        raw, pos = _read_varint(data, pos)
+        cur += (raw >> 1) ^ -(raw & 1)
+        append(cur / scale)
+    return values, pos
+
+
+# 포인트 리스트 -> 컬럼. 압축할 수 없는 형태(알 수 없는 키, lat/lng 누락)면 None
+def columns_from_points(points: List[Dict[str, Any]]) -> Optional[RouteColumns]:
+    if not points:
+        return RouteColumns([], [])
+    keys = set(points[0])
+    if not {"lat", "lng"} <= keys or not keys <= set(ROUTE_FIELDS):
+        return None
+    if any(set(p) != keys for p in points):
+        return None
+    return RouteColumns(
+        lat=[p["lat"] for p in points],
+        lng=[p["lng"] for p in points],
+        t=[p["t"] for p in points] if "t" in keys else None,
+        alt=[p["alt"] for p in points] if "alt" in keys else None,
+    )
+
+
+def points_from_columns(columns: RouteColumns) -> List[Dict[str, float]]:
+    present = [(name, values) for name, values in zip(ROUTE_FIELDS, columns) if values is not None]
+    names = [name for name, _ in present]
+    return [dict(zip(names, row)) for row in zip(*(values for _, values in present))]
+
+
+def encode_columns(columns: RouteColumns) -> Binary:
+    count = len(columns.lat)
+    for values in columns[1:]:
+        if values is not None and len(values) != count:
+            raise ValueError("Route columns must have the same length")
+
+    flags = 0
+    if columns.t is not None:
+        flags |= FLAG_HAS_T
+    if columns.alt is not None:
+        flags |= FLAG_HAS_ALT
+
+    out = bytearray(ROUTE_MAGIC)
+    out.append(ROUTE_VERSION)
+    out.append(flags)
+    _write_varint(out, count)
+    _write_deltas(out, columns.lat, LAT_LNG_SCALE)
+    _write_deltas(out, columns.lng, LAT_LNG_SCALE)
+    if columns.t is not None:
+        _write_deltas(out, columns.t, T_SCALE)
+    if columns.alt is not None:
+        _write_deltas(out, columns.alt, ALT_SCALE)
+    return Binary(bytes(out), ROUTE_BINARY_SUBTYPE)
+
+
+def decode_columns(data: bytes) -> RouteColumns:
+    if not is_encoded_route(data):
+        raise ValueError("Not an encoded route")
+    version = data[3]
+    if version != ROUTE_VERSION:
+        raise ValueError(f"Unsupported route encoding version: {version}")
+    flags = data[4]
+    count, pos = _read_varint(data, 5)
+    lat, pos = _read_deltas(data, pos, count, LAT_LNG_SCALE)
+    lng, pos = _read_deltas(data, pos, count, LAT_LNG_SCALE)
+    t = alt = None
+    if flags & FLAG_HAS_T:
+        t, pos = _read_deltas(data, pos, count, T_SCALE)
+    if flags & FLAG_HAS_ALT:
+        alt, pos = _read_deltas(data, pos, count, ALT_SCALE)
+    return RouteColumns(lat, lng, t, alt)
+
+
+def is_encoded_route(value: Any) -> bool:
+    if isinstance(value, Binary) and value.subtype != ROUTE_BINARY_SUBTYPE:
+        return False
+    return isinstance(value, bytes) and value[:3] == ROUTE_MAGIC and len(value) >= 6
+
+
+# 저장용: 압축 가능한 경로는 Binary로, 아니면 원본 리스트를 그대로 반환
+def encode_route(points: Optional[List[Dict[str, Any]]]) -> Union[Binary, List[Dict[str, Any]], None]:
+    if points is None:
+        return None
+    columns = columns_from_points(points)
+    if columns is None:
+        return points
+    return encode_columns(columns)
+
+
+# 조회용: Binary든 리스트든 포인트 리스트로 반환
+def decode_route(value: Any) -> Any:
+    if is_encoded_route(value):
+        return points_from_columns(decode_columns(value))
+    return value
+
+
+def decode_route_fields(doc: Optional[Dict[str, Any]], fields=("route",)):
+    if doc:
+        for field in fields:
+            if field in doc:
+                doc[field] = decode_route(doc[field])
+    return doc
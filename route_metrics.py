@@ -0,0 +1,79 @@
+import math
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+from route_codec import RouteColumns
+from route_simplify import EARTH_RADIUS_M
+
+MOVING_SPEED_MPS = 0.5  # 이보다 느린 구간은 정지로 보고 이동 시간에서 제외
+SPLIT_DISTANCE_M = 1000.0
+MIN_LAST_SPLIT_M = 10.0  # 마지막 자투리 구간이 이보다 짧으면 스플릿으로 만들지 않음
+
+
+def _pace(duration_s: float, distance_m: float) -> Optional[float]:
+    return round(duration_s / (distance_m / 1000), 1) if distance_m > 0 else None
+
+
+# 포인트 사이 구간 거리(haversine, m)
+# 좌표를 반각 라디안으로 한 번에 바꿔 두고 구간마다 sin 두 번 + asin/sqrt 한 번만 계산
+def _segment_distances(columns: RouteColumns) -> List[float]:
+    half = math.pi / 360
+    lat = [v * half for v in columns.lat]
+    lng = [v * half for v in columns.lng]
+    cos_lat = [math.cos(2 * v) for v in lat]
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+    segments = []
+    append = segments.append
+    for lat0, lat1, lng0, lng1, cos0, cos1 in zip(lat, lat[1:], lng, lng[1:], cos_lat, cos_lat[1:]):
+        sin_lat = sin(lat1 - lat0)
+        sin_lng = sin(lng1 - lng0)
+        a = sin_lat * sin_lat + cos0 * cos1 * sin_lng * sin_lng
+        append(2 * EARTH_RADIUS_M * asin(sqrt(a if a < 1.0 else 1.0)))
+    return segments
+
+
+# 거리(haversine), 이동 시간, 평균 페이스, km 스플릿
+# 구간 거리/이동 시간을 리스트로 한 번에 만들고 누적합에서 km 경계가 있는 구간만 이진 탐색 (포인트마다 분기하지 않음)
+# 시간 배열(t)이 없으면 거리만 계산
+def compute_run_metrics(columns: RouteColumns) -> Dict[str, Any]:
+    segments = _segment_distances(columns)
+    distance = sum(segments)
+    metrics = {"distance_km": round(distance / 1000, 3)}
+    t = columns.t
+    if t is None:
+        return metrics
+
+    moving_segments = [
+        dt if dt > 0 and d / dt >= MOVING_SPEED_MPS else 0.0
+        for d, dt in zip(segments, [t1 - t0 for t0, t1 in zip(t, t[1:])])
+    ]
+    # cumulative[i] / moving_at[i]: i번째 포인트까지의 거리 / 이동 시간
+    cumulative = [0.0, *accumulate(segments)]
+    moving_at = [0.0, *accumulate(moving_segments)]
+    distance, moving = cumulative[-1], moving_at[-1]
+
+    splits = []
+    split_start = 0.0
+    next_split = SPLIT_DISTANCE_M
+    while next_split <= distance:
+        # km 경계를 처음 넘는 포인트 i -> 구간 (i-1, i) 안에서 지나는 시점을 선형 보간
+        i = bisect_left(cumulative, next_split)
+        crossed = moving_at[i - 1] + moving_segments[i - 1] * (next_split - cumulative[i - 1]) / segments[i - 1]
+        splits.append({"km": len(splits) + 1, "distance_m": SPLIT_DISTANCE_M, "duration_s": round(crossed - split_start, 1)})
+        split_start = crossed
+        next_split += SPLIT_DISTANCE_M
+
+    rest = distance - (next_split - SPLIT_DISTANCE_M)
+    if rest >= MIN_LAST_SPLIT_M:
+        splits.append({"km": len(splits) + 1, "distance_m": round(rest, 1), "duration_s": round(moving - split_start, 1)})
+    for split in splits:
+        split["pace_s_per_km"] = _pace(split["duration_s"], split["distance_m"])
+
+    metrics.update({
+        "moving_time_s": round(moving, 1),
+        "average_pace_s_per_km": _pace(moving, distance),
+        "splits": splits,
+    })
+    return metrics
@@ -0,0 +1,55 @@
+import math
+from typing import List
+
+from route_codec import RouteColumns
+
+EARTH_RADIUS_M = 6_371_000.0
+
+
+# 경로 중심 위도 기준 equirectangular 투영 (러닝 경로 규모에서는 오차 무시 가능)
+def project_columns(columns: RouteColumns):
+    lat0 = math.radians(sum(columns.lat) / len(columns.lat))
+    kx = EARTH_RADIUS_M * math.cos(lat0) * math.pi / 180
+    ky = EARTH_RADIUS_M * math.pi / 180
+    return [v * kx for v in columns.lng], [v * ky for v in columns.lat]
+
+
+# Douglas-Peucker: 남길 포인트 마스크 반환 (재귀 대신 스택 사용, 구간 단위로 거리 일괄 계산)
+def douglas_peucker_mask(xs: List[float], ys: List[float], tolerance: float) -> List[bool]:
+    n = len(xs)
+    keep = [True] * n if n <= 2 else [False] * n
+    if n <= 2:
+        return keep
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        x1, y1 = xs[start], ys[start]
+        dx, dy = xs[end] - x1, ys[end] - y1
+        seg_sq = dx * dx + dy * dy
+        xs_seg, ys_seg = xs[start + 1:end], ys[start + 1:end]
+        if seg_sq == 0:
+            dists = [(x - x1) ** 2 + (y - y1) ** 2 for x, y in zip(xs_seg, ys_seg)]
+        else:
+            dists = [((x - x1) * dy - (y - y1) * dx) ** 2 / seg_sq for x, y in zip(xs_seg, ys_seg)]
+        max_dist = max(dists)
+        if max_dist > tolerance_sq:
+            index = start + 1 + dists.index(max_dist)
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return keep
+
+
+def simplify_columns(columns: RouteColumns, tolerance_m: float) -> RouteColumns:
+    if tolerance_m <= 0 or len(columns.lat) <= 2:
+        return columns
+    xs, ys = project_columns(columns)
+    keep = douglas_peucker_mask(xs, ys, tolerance_m)
+    return RouteColumns(*(
+        [v for v, k in zip(values, keep) if k] if values is not None else None
+        for values in columns
+    ))
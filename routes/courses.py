@@ -1,15 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from pydantic import BaseModel
-from database import get_database
+from database import get_database, get_analytics_database
 from bson import ObjectId
 from datetime import datetime, timezone
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
-from bson.binary import Binary
+from gridfs.errors import NoFile
 from models import Course
+from pagination import keyset_filter, keyset_sort, page
+from streaming import wants_ndjson, ndjson_response
+from serializer import BSONJSONResponse
+from settings import settings
+from indexes import require_index
+from geo_cache import course_cache
+from course_counters import recommendation_counter
+from course_images import IMAGE_CACHE_CONTROL, etag_matches, image_bucket, image_content_type, image_etag, store_course_image
 
 router = APIRouter()
 
+_example_id = ObjectId()
+# $geoNear 추천 쿼리
+require_index("courses", [("route_coordinate", "2dsphere")])
+# 유저 코스 목록 (created_by 일치, created_at·_id 내림차순)
+require_index("courses", [("created_by", 1), ("created_at", -1), ("_id", -1)], query={"created_by": _example_id}, sort=[("created_at", -1), ("_id", -1)])
+# 유저·타입별 코스 개수
+require_index("courses", [("created_by", 1), ("course_type", 1)], query={"created_by": _example_id, "course_type": 0})
+
 class CourseCreate(BaseModel):
     route: bytes # 코스 이미지
     route_coordinate: Dict[str, Any] # 코스의 좌표리스트
@@ -20,6 +37,22 @@ class Location(BaseModel):
     latitude: float
     longitude: float
 
+# GeoJSON route_coordinate의 모든 좌표 [(lng, lat), ...] (Point / LineString / Polygon / Multi* 공통)
+def course_points(route_coordinate: Dict[str, Any]):
+    points = []
+
+    def collect(coordinates):
+        if not isinstance(coordinates, list) or not coordinates:
+            return
+        if isinstance(coordinates[0], list):
+            for item in coordinates:
+                collect(item)
+        elif len(coordinates) >= 2:
+            points.append((coordinates[0], coordinates[1]))
+
+    collect(route_coordinate.get("coordinates"))
+    return points
+
 # 코스 저장
 @router.post("/create_course/{user_id}", status_code=status.HTTP_201_CREATED)
 async def create_course(
@@ -27,8 +60,12 @@ async def create_course(
     user_id: str,
     db=Depends(get_database)
 ):
+    course_id = ObjectId()
+    image_id, etag = await store_course_image(db, course.route, course_id)
     course_data = {
-        "route": Binary(course.route),
+        "_id": course_id,
+        "image_id": image_id,  # 코스 이미지 -> GET /courses/{course_id}/image
+        "image_etag": etag,
         "route_coordinate": course.route_coordinate,
         "distance": course.distance,
         "created_by": ObjectId(user_id),  # user_id를 ObjectId로 변환하여 created_by에 저장
@@ -37,77 +74,169 @@ async def create_course(
         "recommendation_count": 0
     }
     result = await db.courses.insert_one(course_data)
-    return {"id": str(result.inserted_id)}
 
-# 코스 추천 -> 최신순 정렬
-@router.post("/latest")
-async def recommend_course_latest(location: Location, db=Depends(get_database)):
-    latitude = location.latitude
-    longitude = location.longitude
+    # 새 코스가 지나는 곳 주변의 추천 캐시 무효화 ($geoNear는 경로의 가장 가까운 점까지 거리로 찾음)
+    points = course_points(course.route_coordinate)
+    if points:
+        await course_cache.invalidate_route(points)
+    return {"id": str(result.inserted_id)}
 
-    # 현재 위치 기준으로 모든 코스를 찾기 위한 쿼리
-    pipeline = [
+# 현재 위치 반경 radius(m) 안의 코스를 sort_field 내림차순으로 limit개 (코스 이미지 제외)
+def nearby_courses_pipeline(location: Location, radius: int, sort_field: str, cursor: Optional[str], limit: int):
+    return [
         {
             "$geoNear": {
-                "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                "near": {"type": "Point", "coordinates": [location.longitude, location.latitude]},
                 "distanceField": "dist.calculated",
-                "maxDistance": 500000000,  # 5000km 이내
+                "maxDistance": radius,
+                "query": keyset_filter(sort_field, cursor),
                 "spherical": True
             }
         },
-        {"$sort": {"created_at": -1}} # 최신순 필터
+        {"$sort": dict(keyset_sort(sort_field))},
+        {"$limit": limit},
+        {"$project": {"route": 0}}
     ]
 
-    courses = await db.courses.aggregate(pipeline).to_list(length=None)
-    if not courses:
-        raise HTTPException(status_code=404, detail="No courses found nearby")
-    return jsonable_encoder(courses, custom_encoder={ObjectId: str})
 
-# 코스 추천 -> 인기순 정렬
-@router.post("/recommend", status_code=status.HTTP_200_OK)
-async def recommend_course_sorted(location: Location, db=Depends(get_database)):
-    latitude = location.latitude
-    longitude = location.longitude
+# 같은 geohash 셀에서 들어온 같은 조건의 요청은 캐시된 응답을 그대로 반환
+async def nearby_courses(request: Request, db, location: Location, radius: int, sort_field: str, cursor: Optional[str], limit: int):
+    if wants_ndjson(request):
+        return ndjson_response(db.courses.aggregate(nearby_courses_pipeline(location, radius, sort_field, cursor, limit)))
 
-    pipeline = [
-        {
-            "$geoNear": {
-                "near": {"type": "Point", "coordinates": [longitude, latitude]},
-                "distanceField": "dist.calculated",
-                "maxDistance": 5000,  # 5km 이내
-                "spherical": True
-            }
-        },
-        {"$sort": {"recommendation_count": -1}} # 인기순 필터
-    ]
+    cache_key, body = await course_cache.lookup(location.latitude, location.longitude, sort_field, radius, limit, cursor)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
 
-    courses = await db.courses.aggregate(pipeline).to_list(length=None)
-    if not courses:
+    docs = await db.courses.aggregate(nearby_courses_pipeline(location, radius, sort_field, cursor, limit + 1)).to_list(length=None)
+    if not docs and not cursor:
         raise HTTPException(status_code=404, detail="No courses found nearby")
-    return jsonable_encoder(courses, custom_encoder={ObjectId: str})
+    courses, next_cursor = page(docs, sort_field, limit)
+    response = BSONJSONResponse({"items": courses, "next": next_cursor})
+    await course_cache.store(cache_key, response.body)
+    return response
+
+
+# 코스 선택("이 코스로 달리기") 기록 -> recommendation_count는 버퍼에 모아 주기적으로 반영
+@router.post("/{course_id}/select", status_code=status.HTTP_202_ACCEPTED)
+async def select_course(course_id: str):
+    if not ObjectId.is_valid(course_id):
+        raise HTTPException(status_code=400, detail="Invalid course id")
+    recommendation_counter.record(ObjectId(course_id))
+    return {"course_id": course_id, "status": "accepted"}
+
+
+# 코스 추천 -> 최신순 정렬
+@router.post("/latest")
+async def recommend_course_latest(
+    location: Location,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    radius: Optional[int] = Query(None, gt=0, le=settings.COURSE_MAX_RADIUS_M),
+    db=Depends(get_analytics_database)
+):
+    return await nearby_courses(request, db, location, radius or settings.COURSE_LATEST_RADIUS_M, "created_at", cursor, limit)
+
+# 코스 추천 -> 인기순 정렬
+@router.post("/recommend", status_code=status.HTTP_200_OK)
+async def recommend_course_sorted(
+    location: Location,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    radius: Optional[int] = Query(None, gt=0, le=settings.COURSE_MAX_RADIUS_M),
+    db=Depends(get_analytics_database)
+):
+    return await nearby_courses(request, db, location, radius or settings.COURSE_RECOMMEND_RADIUS_M, "recommendation_count", cursor, limit)
 
 
 # 코스 id를 받고 코스 전체를 반환하는 엔드포인트
 @router.get("/{course_id}", response_model=Course)
 async def get_course(course_id: str, db=Depends(get_database)):
-    course = await db.courses.find_one({"_id": ObjectId(course_id)})
+    course = await db.courses.find_one({"_id": ObjectId(course_id)}, {"route": 0})
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return jsonable_encoder(course, custom_encoder={ObjectId: str})
 
 
+# 코스 이미지 (ETag / If-None-Match 조건부 요청 지원)
+@router.get("/{course_id}/image")
+async def get_course_image(course_id: str, request: Request, db=Depends(get_database)):
+    course = await db.courses.find_one({"_id": ObjectId(course_id)}, {"image_id": 1, "image_etag": 1, "route": 1})
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    # 마이그레이션 전 코스는 문서 안의 이미지를 그대로 사용
+    legacy_image = course.get("route")
+    etag = course.get("image_etag") or (image_etag(legacy_image) if legacy_image else None)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Course image not found")
+
+    headers = {"ETag": f'"{etag}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if legacy_image:
+        return Response(content=bytes(legacy_image), media_type=image_content_type(legacy_image), headers=headers)
+
+    try:
+        grid_out = await image_bucket(db).open_download_stream(course["image_id"])
+    except NoFile:
+        raise HTTPException(status_code=404, detail="Course image not found")
+
+    async def chunks():
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    headers["Content-Length"] = str(grid_out.length)
+    media_type = (grid_out.metadata or {}).get("content_type", "application/octet-stream")
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
 # user_id와 course_type이 일치하는 코스의 개수 반환
 @router.get("/count/{user_id}/{course_type}", response_model=int)
-async def count_courses(user_id: str, course_type: int, db=Depends(get_database)):
+async def count_courses(user_id: str, course_type: int, db=Depends(get_analytics_database)):
     count = await db.courses.count_documents({"created_by": ObjectId(user_id), "course_type": course_type})
     return count
 
 
-# 유저의 모든 코스 리스트
+# summary: 코스 이미지(route)와 좌표(route_coordinate) 제외
+def course_projection(fields: str):
+    return {"route": 0, "route_coordinate": 0} if fields == "summary" else None
+
+
+# 유저의 코스 리스트 (created_at, _id 기준 커서 페이지네이션)
+# all=true면 기존처럼 전체 목록을 한 번에 반환 (fields를 주지 않으면 기존처럼 전체 문서)
+# Accept: application/x-ndjson이면 cursor 이후 전체를 한 줄에 하나씩 스트리밍 (limit 무시)
 @router.get("/all_courses/{user_id}")
-async def all_courses(user_id: str, db=Depends(get_database)):
-    cursor = db.courses.find({"created_by": ObjectId(user_id)}).sort("created_at", -1)
-    courses = await cursor.to_list(length=None)
-    if not courses:
+async def all_courses(
+    user_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^(summary|full)$"),
+    all_courses: bool = Query(False, alias="all"),
+    db=Depends(get_analytics_database)
+):
+    if fields is None:
+        fields = "full" if all_courses else "summary"
+    query = {"created_by": ObjectId(user_id)}
+    if wants_ndjson(request):
+        query.update(keyset_filter("created_at", cursor))
+        return ndjson_response(db.courses.find(query, course_projection(fields)).sort(keyset_sort("created_at")))
+    if all_courses:
+        courses = await db.courses.find(query, course_projection(fields)).sort("created_at", -1).to_list(length=None)
+        if not courses:
+            raise HTTPException(status_code=404, detail="No courses found for the user")
+        return BSONJSONResponse(courses)
+
+    query.update(keyset_filter("created_at", cursor))
+    docs = await db.courses.find(query, course_projection(fields)).sort(keyset_sort("created_at")).to_list(length=limit + 1)
+    if not docs and not cursor:
         raise HTTPException(status_code=404, detail="No courses found for the user")
-    return jsonable_encoder(courses, custom_encoder={ObjectId: str})
+    courses, next_cursor = page(docs, "created_at", limit)
+    return BSONJSONResponse({"items": courses, "next": next_cursor})
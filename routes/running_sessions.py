@@ -1,26 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from pydantic import BaseModel
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError, model_validator
 from database import get_database
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from bson import ObjectId
-from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
 from models import Run
+from route_codec import RouteColumns, columns_from_points, points_from_columns, encode_columns, encode_route, decode_route
+from route_simplify import simplify_columns
+from route_metrics import compute_run_metrics
+from stats_rollup import apply_statistics_once, bump_stats_version, record_daily_run
+from pagination import keyset_filter, keyset_sort, page
+from streaming import wants_ndjson, ndjson_response
+from serializer import BSONJSONResponse
+from settings import settings
+from indexes import require_index
+from jobs import enqueue, job_handler, job_workers
 from typing import List, Optional, Dict
 
 router = APIRouter()
+logger = logging.getLogger("runaway.running_sessions")
 
-class RunningSessionCreate(BaseModel):
+_example_id = ObjectId()
+# 러닝 기록 목록 / 최근 기록 (user_id 일치, date·_id 내림차순)
+require_index("runs", [("user_id", 1), ("date", -1), ("_id", -1)], query={"user_id": _example_id}, sort=[("date", -1), ("_id", -1)])
+# 유저별 진행 중인 세션 조회
+require_index("running_sessions", [("user_id", 1), ("status", 1)], query={"user_id": _example_id, "status": "in_progress"})
+# GPS 청크 (중복 방지 + 순서대로 조회)
+require_index("running_session_points", [("session_id", 1), ("seq", 1)], unique=True, query={"session_id": _example_id}, sort=[("seq", 1)])
+# 통계 단건 조회 / 원자적 갱신 (upsert 중복 방지)
+require_index("statistics", [("user_id", 1)], unique=True, query={"user_id": _example_id})
+
+# GPS 경로 입력 형식
+# - 기존 형식: route=[{"lat": .., "lng": .., ...}, ...]
+# - 컬럼 형식: lat=[..], lng=[..], t=[..], alt=[..] -> 배열 단위로 검증되어 포인트마다 dict를 만들지 않음
+class RoutePayload(BaseModel):
+    route: List[Dict[str, float]] = []
+    lat: Optional[List[float]] = None
+    lng: Optional[List[float]] = None
+    t: Optional[List[float]] = None
+    alt: Optional[List[float]] = None
+
+    @model_validator(mode="after")
+    def check_route_columns(self):
+        if (self.lat is None) != (self.lng is None):
+            raise ValueError("lat and lng must be sent together")
+        if self.lat is None:
+            if self.t is not None or self.alt is not None:
+                raise ValueError("t and alt require lat and lng")
+            return self
+        if self.route:
+            raise ValueError("Send either route or lat/lng arrays, not both")
+        for name in ("lng", "t", "alt"):
+            values = getattr(self, name)
+            if values is not None and len(values) != len(self.lat):
+                raise ValueError(f"{name} must have the same length as lat")
+        return self
+
+    def point_count(self) -> int:
+        return len(self.lat) if self.lat is not None else len(self.route)
+
+    # 압축할 수 없는 기존 형식이면 None
+    def route_columns(self) -> Optional[RouteColumns]:
+        if self.lat is not None:
+            return RouteColumns(self.lat, self.lng, self.t, self.alt)
+        return columns_from_points(self.route)
+
+    def encoded_route(self):
+        if self.lat is not None:
+            return encode_columns(self.route_columns())
+        return encode_route(self.route)
+
+    def route_points(self) -> List[Dict[str, float]]:
+        if self.lat is not None:
+            return points_from_columns(self.route_columns())
+        return self.route
+
+
+# /points로 업로드된 청크가 있으면 seq 순으로 이어 붙이고 본문의 경로(마지막 구간)를 뒤에 붙임
+class RunningSessionCreate(RoutePayload):
     distance: float
     duration: int
     average_pace: float
     current_pace: float = None
-    route: List[Dict[str, float]]
     strength: int = None
     course_id: Optional[str] = None
     
-class RunningSessionUpdate(BaseModel):
+# 러닝 중 주기적으로 전송되는 GPS 청크
+class RunningSessionUpdate(RoutePayload):
     current_distance: float
     current_time: float
+    seq: int  # 청크 순번 (재전송 시 중복 저장 방지)
 
 # 런닝세션 시작
 @router.post("/start", status_code=status.HTTP_201_CREATED)
@@ -38,110 +109,284 @@ async def start_running_session(request: Request, db=Depends(get_database)):
     return {"session_id": str(result.inserted_id)}
 
 
-# 런닝 종료 후 Run데이터 생성 및 통계 업데이트
+async def append_session_points(session_id: str, update: RunningSessionUpdate, db):
+    result = await db.running_sessions.update_one(
+        {"_id": ObjectId(session_id), "status": "in_progress"},
+        {
+            "$set": {"current_distance": update.current_distance, "current_time": update.current_time},
+            "$max": {"last_seq": update.seq}
+        }
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Running session not found or already ended")
+
+    # (session_id, seq) 유니크 -> 같은 청크를 다시 보내도 한 번만 저장됨
+    try:
+        await db.running_session_points.update_one(
+            {"session_id": ObjectId(session_id), "seq": update.seq},
+            {"$setOnInsert": {
+                "route": update.encoded_route(),
+                "count": update.point_count(),
+                "created_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # 동시에 재전송된 같은 청크
+    return {"session_id": session_id, "seq": update.seq}
+
+
+async def load_session_route(session_id: str, db):
+    cursor = db.running_session_points.find({"session_id": ObjectId(session_id)}, {"route": 1}).sort("seq", 1)
+    route = []
+    async for chunk in cursor:
+        route.extend(decode_route(chunk["route"]))
+    return route
+
+
+# 러닝 중 GPS 청크 추가
+@router.post("/{session_id}/points")
+async def append_running_points(session_id: str, update: RunningSessionUpdate, db=Depends(get_database)):
+    return await append_session_points(session_id, update, db)
+
+
+# 러닝 중 GPS 청크 추가 (WebSocket) - 메시지 형식은 /points 와 동일, 청크마다 {"seq": n} 으로 응답
+@router.websocket("/{session_id}/ws")
+async def running_points_websocket(websocket: WebSocket, session_id: str, db=Depends(get_database)):
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_json()
+            try:
+                update = RunningSessionUpdate(**message)
+                await websocket.send_json(await append_session_points(session_id, update, db))
+            except ValidationError as e:
+                await websocket.send_json({"error": "Invalid chunk", "detail": e.errors(include_url=False)})
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail})
+                await websocket.close(code=1008)
+                return
+    except WebSocketDisconnect:
+        pass
+
+
+# 지도 표시용 단순화 경로(route)와 원본 경로(raw_route, 설정 시)
+def build_route_fields(columns: Optional[RouteColumns], points: List[Dict[str, float]]):
+    if columns is None:
+        return {"route": points}  # 압축할 수 없는 형식은 단순화하지 않고 그대로 저장
+    fields = {"route": encode_columns(simplify_columns(columns, settings.ROUTE_SIMPLIFY_TOLERANCE_M))}
+    if settings.STORE_RAW_ROUTE:
+        fields["raw_route"] = encode_columns(columns)
+    return fields
+
+
+# 런 저장이나 작업 등록이 실패하면 세션을 진행 중으로 되돌림 -> 같은 요청으로 다시 종료할 수 있음
+# 한쪽만 성공했으면 저장된 런 / 등록된 작업도 지움 (재시도 시 런이 두 번 생기지 않도록)
+async def revert_session_end(session_id: str, run_id: ObjectId, job_id, db):
+    try:
+        await db.runs.delete_one({"_id": run_id})
+        if isinstance(job_id, ObjectId):
+            await db.jobs.delete_one({"_id": job_id})
+        await db.running_sessions.update_one(
+            {"_id": ObjectId(session_id), "run_id": run_id},
+            {"$set": {"status": "in_progress"}, "$unset": {"run_id": "", "end_time": ""}}
+        )
+    except Exception:
+        logger.exception("Failed to revert session %s after run %s was not stored", session_id, run_id)
+
+
+# 런닝 종료: 세션 조회와 완료 처리를 find_one_and_update 한 번으로 하고
+# 런 저장과 후처리 작업(post_run: 통계 / 일별 집계) 등록을 동시에 실행 -> 런이 저장되면 바로 응답
+# 경로는 runs에만 저장하고 세션에는 run_id만 남김
 @router.post("/{session_id}/end")
 async def end_running_session(session_id: str, session_data: RunningSessionCreate, db=Depends(get_database)):
-    session = await db.running_sessions.find_one({"_id": ObjectId(session_id)})
+    now = datetime.now(timezone.utc)
+    run_id = ObjectId()
+    session = await db.running_sessions.find_one_and_update(
+        {"_id": ObjectId(session_id), "status": "in_progress"},
+        {"$set": {
+            "end_time": now,
+            "distance": session_data.distance,
+            "duration": session_data.duration,
+            "average_pace": session_data.average_pace,
+            "run_id": run_id,
+            "status": "completed"
+        }},
+        projection={"user_id": 1, "last_seq": 1}
+    )
     if not session:
+        if await db.running_sessions.find_one({"_id": ObjectId(session_id)}, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="Session already ended")
         raise HTTPException(status_code=404, detail="Session not found")
 
-    update_data = {
-        "end_time": datetime.now(timezone.utc),
-        "distance": session_data.distance,
-        "duration": session_data.duration,
-        "average_pace": session_data.average_pace,
-        "route": session_data.route,
-        "status": "completed"
-    }
-
-    await db.running_sessions.update_one({"_id": ObjectId(session_id)}, {"$set": update_data})
+    if session.get("last_seq") is not None:
+        points = await load_session_route(session_id, db) + session_data.route_points()
+        columns = columns_from_points(points)
+    else:
+        points = session_data.route
+        columns = session_data.route_columns()
+    route_fields = build_route_fields(columns, points)
+    # 서버에서 계산한 거리/이동 시간/페이스/스플릿 (단순화 전 원본 경로 기준)
+    metrics = compute_run_metrics(columns) if columns is not None else None
 
     user_id = session.get("user_id")
-    if user_id:
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        if user:
-            try:
-                run_data = Run(
-                    user_id=user_id,
-                    date=datetime.now(timezone.utc),
-                    distance=session_data.distance,
-                    duration=session_data.duration,
-                    average_pace=session_data.average_pace,
-                    route=session_data.route,
-                    strength=session_data.strength,
-                    course_id=ObjectId(session_data.course_id) if session_data.course_id else None
-                )
-                insert_result = await db.runs.insert_one(run_data.dict(by_alias=True))
-                if not insert_result.acknowledged:
-                    raise HTTPException(status_code=500, detail="Failed to insert run data")
-
-                await update_user_statistics(user_id, session_data, db)
-                
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error occurred while creating run data: {str(e)}")
-
-    return {"message": "Session ended successfully"}
-
-async def update_user_statistics(user_id: str, session_data: RunningSessionCreate, db):
-    user_stats = await db.statistics.find_one({"user_id": ObjectId(user_id)})
-    if not user_stats:
-        raise HTTPException(status_code=404, detail="User statistics not found")
+    if not user_id:
+        # 유저 없는 세션은 런을 만들지 않으므로 경로를 세션에 보관
+        await db.running_sessions.update_one({"_id": ObjectId(session_id)}, {"$set": route_fields, "$unset": {"run_id": ""}})
+    else:
+        job_id = None
+        try:
+            run_data = Run(
+                id=run_id,
+                user_id=user_id,
+                date=now,
+                distance=session_data.distance,
+                duration=session_data.duration,
+                average_pace=session_data.average_pace,
+                **route_fields,
+                metrics=metrics,
+                strength=session_data.strength,
+                course_id=ObjectId(session_data.course_id) if session_data.course_id else None
+            )
+            insert_result, job_id = await asyncio.gather(
+                db.runs.insert_one(run_data.dict(by_alias=True)),
+                enqueue(db, POST_RUN_JOB, {"run_id": run_id}),
+                return_exceptions=True
+            )
+            for result in (insert_result, job_id):
+                if isinstance(result, Exception):
+                    raise result
+            if not insert_result.acknowledged:
+                raise HTTPException(status_code=500, detail="Failed to insert run data")
+        except Exception as e:
+            await revert_session_end(session_id, run_id, job_id, db)
+            raise HTTPException(status_code=500, detail=f"Error occurred while creating run data: {str(e)}")
+        job_workers.notify()
 
-    now = datetime.now(timezone.utc)
+    # 런 저장이 끝난 뒤에만 청크 삭제 (실패 시 청크로 다시 종료할 수 있도록)
+    if session.get("last_seq") is not None:
+        await db.running_session_points.delete_many({"session_id": ObjectId(session_id)})
 
-    def make_offset_aware(dt):
-        if dt is None or dt.tzinfo is None:
-            return dt.replace(tzinfo=timezone.utc)
-        return dt
-
-    def update_stats(stats, period_key, period_length):
-        period_start = make_offset_aware(stats[period_key + "_start"])
-        period_end = period_start + period_length
-
-        if period_start <= now <= period_end:
-            stats["distance"] += session_data.distance
-            stats["duration"] += session_data.duration
-            stats["count"] += 1
-            stats["average_pace"] = (stats["average_pace"] * (stats["count"] - 1) + session_data.average_pace) / stats["count"] if stats["count"] > 0 else session_data.average_pace
-        else:
-            stats.update({
-                period_key + "_start": now,
-                "distance": session_data.distance,
-                "duration": session_data.duration,
-                "count": 1,
-                "average_pace": session_data.average_pace
-            })
-    
-    # 주간 통계 업데이트
-    update_stats(user_stats["weekly"], "week", timedelta(weeks=1))
+    return {"message": "Session ended successfully", "run_id": str(run_id) if user_id else None}
+
+# 런 후처리 작업: 런 문서 기준으로 통계 / 일별 집계 반영
+# 재시도나 lease 만료로 같은 작업이 다시 실행될 수 있으므로 각 단계는 갱신하는 문서에 런 _id를 남겨 한 번만 반영
+# (statistics.applied_runs / daily_stats.run_ids / users.recent_runs), 끝낸 단계는 런의 post_run 배열에도 기록해 건너뜀
+POST_RUN_JOB = "post_run"
+
+
+# 후처리 단계는 동시에 실행되며 통계와 일별 집계 단계가 각각 statistics.version을 올림
+# (파이프라인의 version + 1 / bump_stats_version) -> 대시보드 ETag가 합계와 그래프 변경을 모두 반영
+async def apply_run_statistics(db, run):
+    await apply_statistics_once(db, run["user_id"], run["_id"], run["date"], run["distance"], run["duration"], run["average_pace"])
+
+
+async def apply_daily_stats(db, run):
+    if await record_daily_run(db, run["user_id"], run["date"], run["distance"], run["duration"], run["_id"]):
+        await bump_stats_version(db, run["user_id"])
 
-    # 월간 통계 업데이트
-    update_stats(user_stats["monthly"], "month", timedelta(days=30))  # 30일을 한 달로 간주
 
-    # 연간 통계 업데이트
-    update_stats(user_stats["yearly"], "year", timedelta(days=365))  # 365일을 1년으로 간주
+# 유저 문서의 recent_runs: 최근 RECENT_RUNS_LIMIT개 런의 요약 (경로 제외) -> 홈 화면은 유저 문서 한 번 읽기로 끝남
+RECENT_RUNS_LIMIT = 3
+RUN_SUMMARY_FIELDS = ("date", "distance", "duration", "average_pace", "strength", "course_id")
 
-    # 전체 통계 업데이트
-    user_stats["totally"]["distance"] += session_data.distance
-    user_stats["totally"]["duration"] += session_data.duration
-    user_stats["totally"]["count"] += 1
-    user_stats["totally"]["average_pace"] = (user_stats["totally"]["average_pace"] * (user_stats["totally"]["count"] - 1) + session_data.average_pace) / user_stats["totally"]["count"] if user_stats["totally"]["count"] > 0 else session_data.average_pace
 
-    await db.statistics.update_one({"user_id": ObjectId(user_id)}, {"$set": user_stats})
+def run_summary(run):
+    return {"_id": run["_id"], **{field: run.get(field) for field in RUN_SUMMARY_FIELDS}}
 
 
+async def apply_recent_runs(db, run):
+    # 이미 들어간 런은 다시 넣지 않음 (재시도 대비)
+    # recent_runs가 없는 유저(백필 전)는 건드리지 않음 -> 런 하나짜리 배열이 생기면 runs 조회로 넘어가지 않게 되므로
+    await db.users.update_one(
+        {"_id": run["user_id"], "recent_runs": {"$exists": True}, "recent_runs._id": {"$ne": run["_id"]}},
+        {"$push": {"recent_runs": {"$each": [run_summary(run)], "$sort": {"date": -1}, "$slice": RECENT_RUNS_LIMIT}}}
+    )
 
-# DB에 저장된 유저의 최근 완료된 세 개의 런닝기록 조회
+
+POST_RUN_STEPS = {
+    "statistics": apply_run_statistics,
+    "daily_stats": apply_daily_stats,
+    "recent_runs": apply_recent_runs,
+}
+
+
+@job_handler(POST_RUN_JOB)
+async def process_post_run(db, payload):
+    run = await db.runs.find_one({"_id": payload["run_id"]}, {"route": 0, "raw_route": 0, "metrics": 0})
+    if run is None:
+        # 런 저장과 동시에 등록되므로 아직 보이지 않을 수 있음 -> 재시도
+        raise LookupError(f"Run {payload['run_id']} not found")
+    done = set(run.get("post_run", []))
+
+    async def run_step(name, step):
+        await step(db, run)
+        await db.runs.update_one({"_id": run["_id"]}, {"$addToSet": {"post_run": name}})
+
+    await asyncio.gather(*(run_step(name, step) for name, step in POST_RUN_STEPS.items() if name not in done))
+
+
+# 기본은 단순화된 route만 반환, raw=true면 원본 raw_route 포함
+# summary는 경로/스플릿 없이 요약 정보만
+def run_projection(raw: bool, fields: str = "full"):
+    if fields == "summary":
+        return {"route": 0, "raw_route": 0, "metrics.splits": 0}
+    return None if raw else {"raw_route": 0}
+
+
+# 유저의 최근 완료된 세 개의 런닝기록 요약 (유저 문서의 recent_runs 한 번 읽기)
+# recent_runs가 아직 없는 유저(백필 전)나 NDJSON 요청은 runs에서 조회, raw=true면 경로를 포함한 전체 문서
 @router.get("/runs/{user_id}")
-async def get_user_running_history(user_id: str, db=Depends(get_database)):
-    cursor = db.runs.find({"user_id": ObjectId(user_id)}).sort("date", -1)
-    runs = await cursor.to_list(length=3)
-    return jsonable_encoder(runs, custom_encoder={ObjectId: str})
+async def get_user_running_history(user_id: str, request: Request, raw: bool = False, db=Depends(get_database)):
+    ndjson = wants_ndjson(request)
+    if not raw and not ndjson:
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, {"recent_runs": 1})
+        if user and user.get("recent_runs") is not None:
+            return BSONJSONResponse(user["recent_runs"])
+
+    projection = None if raw else {field: 1 for field in RUN_SUMMARY_FIELDS}
+    cursor = db.runs.find({"user_id": ObjectId(user_id)}, projection).sort("date", -1)
+    if ndjson:
+        return ndjson_response(cursor.limit(RECENT_RUNS_LIMIT))
+    runs = await cursor.to_list(length=RECENT_RUNS_LIMIT)
+    return BSONJSONResponse(runs)
+
+# 런 종료 시 계산해 둔 km 스플릿 조회 (요청마다 재계산하지 않음)
+@router.get("/runs/{run_id}/splits")
+async def get_run_splits(run_id: str, db=Depends(get_database)):
+    run = await db.runs.find_one({"_id": ObjectId(run_id)}, {"metrics": 1})
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    metrics = run.get("metrics")
+    if not metrics or "splits" not in metrics:
+        raise HTTPException(status_code=404, detail="Splits not available for this run")
+    return {"run_id": run_id, **metrics}
 
-# DB에 저장된 특정 사용자의 모든 러닝 기록 조회
+# DB에 저장된 특정 사용자의 러닝 기록 조회 (date, _id 기준 커서 페이지네이션)
+# all=true면 기존처럼 전체 목록을 한 번에 반환 (fields를 주지 않으면 기존처럼 전체 문서)
+# Accept: application/x-ndjson이면 cursor 이후 전체를 한 줄에 하나씩 스트리밍 (limit 무시)
 @router.get("/all_runs/{user_id}")
-async def get_user_runs(user_id: str, db=Depends(get_database)):
-    cursor = db.runs.find({"user_id": ObjectId(user_id)}).sort("date", -1)
-    runs = await cursor.to_list(length=None)
-    return jsonable_encoder(runs, custom_encoder={ObjectId: str})
+async def get_user_runs(
+    user_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^(summary|full)$"),
+    raw: bool = False,
+    all_runs: bool = Query(False, alias="all"),
+    db=Depends(get_database)
+):
+    if fields is None:
+        fields = "full" if all_runs else "summary"
+    query = {"user_id": ObjectId(user_id)}
+    if wants_ndjson(request):
+        query.update(keyset_filter("date", cursor))
+        return ndjson_response(db.runs.find(query, run_projection(raw, fields)).sort(keyset_sort("date")))
+    if all_runs:
+        runs = await db.runs.find(query, run_projection(raw, fields)).sort("date", -1).to_list(length=None)
+        return BSONJSONResponse(runs)
 
+    query.update(keyset_filter("date", cursor))
+    docs = await db.runs.find(query, run_projection(raw, fields)).sort(keyset_sort("date")).to_list(length=limit + 1)
+    runs, next_cursor = page(docs, "date", limit)
+    return BSONJSONResponse({"items": runs, "next": next_cursor})
@@ -1,19 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from database import get_database
+import asyncio
+import calendar
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from database import get_analytics_database, get_database
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from models import Statistics, WeeklyStats, MonthlyStats, YearlyStats, TotalStats
+from course_images import etag_matches
+from serializer import BSONJSONResponse
+from stats_rollup import distance_by, distance_series, is_current_period, period_starts
 
 router = APIRouter()
 
 @router.get("/weekly/{user_id}", response_model=Statistics)
-async def get_weekly_stats(user_id: str, db=Depends(get_database)):
+async def get_weekly_stats(user_id: str, db=Depends(get_analytics_database)):
     statistics = await db.statistics.find_one({"user_id": ObjectId(user_id)})
     today = datetime.now(timezone.utc)
     start_date = today - timedelta(days=today.weekday())
     start_date = datetime(start_date.year, start_date.month, start_date.day, tzinfo=timezone.utc)
 
-    if not statistics or "weekly" not in statistics:
+    if not statistics or "weekly" not in statistics or not is_current_period(statistics["weekly"].get("week_start"), start_date):
         return Statistics(user_id=ObjectId(user_id), weekly=WeeklyStats(
             week_start=start_date,
             distance=0,
@@ -35,12 +40,12 @@ async def get_weekly_stats(user_id: str, db=Depends(get_database)):
     )
 
 @router.get("/monthly/{user_id}", response_model=Statistics)
-async def get_monthly_stats(user_id: str, db=Depends(get_database)):
+async def get_monthly_stats(user_id: str, db=Depends(get_analytics_database)):
     statistics = await db.statistics.find_one({"user_id": ObjectId(user_id)})
     today = datetime.now(timezone.utc)
     start_date = datetime(today.year, today.month, 1, tzinfo=timezone.utc)
 
-    if not statistics or "monthly" not in statistics:
+    if not statistics or "monthly" not in statistics or not is_current_period(statistics["monthly"].get("month_start"), start_date):
         return Statistics(user_id=ObjectId(user_id), monthly=MonthlyStats(
             month_start=start_date,
             distance=0,
@@ -62,12 +67,12 @@ async def get_monthly_stats(user_id: str, db=Depends(get_database)):
     )
 
 @router.get("/yearly/{user_id}", response_model=Statistics)
-async def get_yearly_stats(user_id: str, db=Depends(get_database)):
+async def get_yearly_stats(user_id: str, db=Depends(get_analytics_database)):
     statistics = await db.statistics.find_one({"user_id": ObjectId(user_id)})
     today = datetime.now(timezone.utc)
     start_date = datetime(today.year, 1, 1, tzinfo=timezone.utc)
     
-    if not statistics or "yearly" not in statistics:
+    if not statistics or "yearly" not in statistics or not is_current_period(statistics["yearly"].get("year_start"), start_date):
         return Statistics(user_id=ObjectId(user_id), yearly=YearlyStats(
             year_start=start_date,
             distance=0,
@@ -89,7 +94,7 @@ async def get_yearly_stats(user_id: str, db=Depends(get_database)):
     )
 
 @router.get("/all_time/{user_id}", response_model=Statistics)
-async def get_all_time_stats(user_id: str, db=Depends(get_database)):
+async def get_all_time_stats(user_id: str, db=Depends(get_analytics_database)):
     statistics = await db.statistics.find_one({"user_id": ObjectId(user_id)})
 
 
@@ -116,86 +121,100 @@ async def get_all_time_stats(user_id: str, db=Depends(get_database)):
     )
     
     
-# 그래프 만들기
+# 그래프 만들기 (daily_stats 일별 집계 기반)
+# 단위별 {키: 거리} -> 그래프 x, y
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def weekly_graph(distance_by_weekday):
+    return {"x": WEEKDAYS, "y": [distance_by_weekday.get(i + 1, 0) for i in range(len(WEEKDAYS))]}
+
+
+def monthly_graph(distance_by_day, today: datetime):
+    x = list(range(1, calendar.monthrange(today.year, today.month)[1] + 1))
+    return {"x": x, "y": [distance_by_day.get(day, 0) for day in x]}
+
+
+def yearly_graph(distance_by_month):
+    x = list(range(1, 13))
+    return {"x": x, "y": [distance_by_month.get(month, 0) for month in x]}
+
+
+def all_time_graph(distance_by_year):
+    x = sorted(distance_by_year)
+    return {"x": x, "y": [distance_by_year[year] for year in x]}
+
+
 # 주간 그래프
 @router.get("/weekly_data/{user_id}")
-async def get_weekly_data(user_id: str, db=Depends(get_database)):
+async def get_weekly_data(user_id: str, db=Depends(get_analytics_database)):
     today = datetime.now(timezone.utc)
     start_date = today - timedelta(days=today.weekday())
-    
-    runs = await db.runs.find({"user_id": ObjectId(user_id), "date": {"$gte": start_date}}).to_list(length=None)
-    
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    distance_by_day = {day: 0 for day in days}
-    
-    for run in runs:
-        day = days[run['date'].weekday()]
-        distance_by_day[day] += run['distance']
-    
-    x = list(distance_by_day.keys())
-    y = list(distance_by_day.values())
-    
-    return {"x": x, "y": y}
+    return weekly_graph(await distance_by(db, user_id, "weekday", start_date))
 
 # 월간 그래프
 @router.get("/monthly_data/{user_id}")
-async def get_monthly_data(user_id: str, db=Depends(get_database)):
+async def get_monthly_data(user_id: str, db=Depends(get_analytics_database)):
     today = datetime.now(timezone.utc)
     start_date = datetime(today.year, today.month, 1, tzinfo=timezone.utc)
-    
-    runs = await db.runs.find({"user_id": ObjectId(user_id), "date": {"$gte": start_date}}).to_list(length=None)
-    
-    days_in_month = (today.replace(month=today.month % 12 + 1, day=1) - timedelta(days=1)).day
-    distance_by_day = {day: 0 for day in range(1, days_in_month + 1)}
-    
-    for run in runs:
-        day = run['date'].day
-        distance_by_day[day] += run['distance']
-    
-    x = list(distance_by_day.keys())
-    y = list(distance_by_day.values())
-    
-    return {"x": x, "y": y}
+    return monthly_graph(await distance_by(db, user_id, "day", start_date), today)
 
 # 연간 그래프
 @router.get("/yearly_data/{user_id}")
-async def get_yearly_data(user_id: str, db=Depends(get_database)):
+async def get_yearly_data(user_id: str, db=Depends(get_analytics_database)):
     today = datetime.now(timezone.utc)
     start_date = datetime(today.year, 1, 1, tzinfo=timezone.utc)
-    
-    runs = await db.runs.find({"user_id": ObjectId(user_id), "date": {"$gte": start_date}}).to_list(length=None)
-    
-    distance_by_month = {month: 0 for month in range(1, 13)}
-    
-    for run in runs:
-        month = run['date'].month
-        distance_by_month[month] += run['distance']
-    
-    x = list(distance_by_month.keys())
-    y = list(distance_by_month.values())
-    
-    return {"x": x, "y": y}
+    return yearly_graph(await distance_by(db, user_id, "month", start_date))
 
 # 전체 그래프
 @router.get("/all_time_data/{user_id}")
-async def get_all_time_data(user_id: str, db=Depends(get_database)):
-    runs = await db.runs.find({"user_id": ObjectId(user_id)}).to_list(length=None)
-    
-    distance_by_year = {}
-    
-    for run in runs:
-        year = run['date'].year
-        if year not in distance_by_year:
-            distance_by_year[year] = 0
-        distance_by_year[year] += run['distance']
-    
-    x = list(distance_by_year.keys())
-    y = list(distance_by_year.values())
-    
-    return {"x": x, "y": y}
+async def get_all_time_data(user_id: str, db=Depends(get_analytics_database)):
+    return all_time_graph(await distance_by(db, user_id, "year"))
 
 
+PERIOD_FIELDS = ("distance", "duration", "count", "average_pace")
 
 
+def dashboard_etag(version: int, today: datetime) -> str:
+    # 런이 없어도 날짜가 바뀌면 기간/그래프 축이 달라질 수 있으므로 날짜도 포함
+    return f"stats-{version}-{today:%Y%m%d}"
 
 
+# 통계 화면 전체: 기간별 통계 4개 + 그래프 4개
+# statistics find_one과 daily_stats $facet 한 번을 동시에 조회
+# ETag = 통계 버전(런 반영 / 재계산 때마다 증가) + 날짜, 같으면 version 필드만 읽고 304
+# 버전은 primary에서 읽음 (런 후처리는 다른 프로세스에서도 실행되고, 보조 노드는 늦을 수 있으므로 오래된 304 방지)
+@router.get("/dashboard/{user_id}")
+async def get_dashboard(user_id: str, request: Request, db=Depends(get_analytics_database), primary=Depends(get_database)):
+    user_oid = ObjectId(user_id)
+    today = datetime.now(timezone.utc)
+    headers = {"Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        doc = await primary.statistics.find_one({"user_id": user_oid}, {"version": 1})
+        etag = dashboard_etag(doc.get("version", 0) if doc else 0, today)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={**headers, "ETag": f'"{etag}"'})
+
+    statistics, series = await asyncio.gather(
+        db.statistics.find_one({"user_id": user_oid}),
+        distance_series(db, user_oid, today)
+    )
+    statistics = statistics or {}
+    version = statistics.get("version", 0)
+
+    body = {"user_id": user_oid, "version": version}
+    for field, (start_key, start) in period_starts(today).items():
+        stored = statistics.get(field) or {}
+        current = is_current_period(stored.get(start_key), start)
+        body[field] = {start_key: start, **{key: stored.get(key, 0) if current else 0 for key in PERIOD_FIELDS}}
+    totally = statistics.get("totally") or {}
+    body["totally"] = {"year_start": totally.get("year_start", today), **{key: totally.get(key, 0) for key in PERIOD_FIELDS}}
+    body["graphs"] = {
+        "weekly": weekly_graph(series["weekly"]),
+        "monthly": monthly_graph(series["monthly"], today),
+        "yearly": yearly_graph(series["yearly"]),
+        "all_time": all_time_graph(series["all_time"]),
+    }
+    return BSONJSONResponse(body, headers={**headers, "ETag": f'"{dashboard_etag(version, today)}"'})
@@ -3,14 +3,20 @@ from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from database import get_database
 from bson import ObjectId
-from utils import create_access_token, create_refresh_token, decode_token, authenticate_user, get_password_hash, verify_password
+from utils import create_access_token, create_refresh_token, authenticate_user, hash_password, verify_and_update_password
 from datetime import datetime, timedelta, timezone
 from settings import settings
 from models import User
+from stats_rollup import empty_statistics
+from auth_cache import verify_token, forget_token, get_current_user, invalidate_user
 from typing import Optional
+from indexes import require_index
 
 router = APIRouter()
 
+# 로그인 / 회원가입 / 토큰 갱신 / auth_cache 유저 조회
+require_index("users", [("username", 1)], unique=True, query={"username": ""})
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -40,7 +46,8 @@ async def login_for_access_token(request: Request, db=Depends(get_database)):
     
     # 기존 로직을 사용합니다.
     user = await db.users.find_one({"username": user_login.username})
-    if not user or not verify_password(user_login.password, user["password"]):
+    valid, new_hash = await verify_and_update_password(user_login.password, user["password"]) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -53,21 +60,19 @@ async def login_for_access_token(request: Request, db=Depends(get_database)):
     )
     refresh_token = create_refresh_token(data={"sub": user["username"]})
     
-    # 리프레시 토큰을 DB에 저장
-    await db.users.update_one({"_id": user["_id"]}, {"$set": {"refresh_token": refresh_token}})
+    # 리프레시 토큰을 DB에 저장 (bcrypt cost가 바뀌었으면 비밀번호도 새 해시로 교체)
+    update = {"refresh_token": refresh_token}
+    if new_hash:
+        update["password"] = new_hash
+    await db.users.update_one({"_id": user["_id"]}, {"$set": update})
+    invalidate_user(user["username"])
     
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer", "user_id": str(user["_id"])}
 
-# RefreshToken을 사용하여 사용자에게 새로운 AccessToken을 반환
+# RefreshToken을 사용하여 사용자에게 새로운 AccessToken을 반환 (리프레시 토큰도 새로 발급)
 @router.post("/refresh", response_model=Token)
 async def refresh_access_token(request: RefreshTokenRequest, db=Depends(get_database)):
-    payload = await decode_token(request.refresh_token)
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid refresh token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    payload = verify_token(request.refresh_token)
     username: str = payload.get("sub")
     if username is None:
         raise HTTPException(
@@ -86,7 +91,22 @@ async def refresh_access_token(request: RefreshTokenRequest, db=Depends(get_data
     access_token = create_access_token(
         data={"sub": user["username"]}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "refresh_token": request.refresh_token, "token_type": "bearer"}
+    refresh_token = create_refresh_token(data={"sub": user["username"]})
+
+    # 이전 리프레시 토큰이 아직 저장된 값일 때만 교체 (동시에 들어온 같은 토큰은 한 번만 성공)
+    result = await db.users.update_one(
+        {"_id": user["_id"], "refresh_token": request.refresh_token},
+        {"$set": {"refresh_token": refresh_token}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    forget_token(request.refresh_token)
+    invalidate_user(user["username"])
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
 
@@ -97,80 +117,19 @@ async def register_user(user: UserCreate, db=Depends(get_database)):
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # 비밀번호 해싱
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = user.dict()
     user_data["password"] = hashed_password
     user_data["created_at"] = datetime.utcnow()
+    user_data["recent_runs"] = []  # 런 후처리 작업이 최근 런 요약을 채움
     result = await db.users.insert_one(user_data)
     
-    # 통계 데이터 초기화
-    now = datetime.now(timezone.utc)
-    
-    # 이번 주 월요일 날짜 계산
-    week_start = now - timedelta(days=now.weekday())
-    week_start = datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc)
-    
-    # 이번 달 1일 날짜 계산
-    month_start = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
-    
-    # 올해 1월 1일 날짜 계산
-    year_start = datetime(now.year, 1, 1, tzinfo=timezone.utc)
-    statistics_data = {
-        "user_id": result.inserted_id,
-        "weekly": {
-            "week_start": week_start,
-            "distance": 0,
-            "duration": 0,
-            "count": 0,
-            "average_pace": 0
-        },
-        "monthly": {
-            "month_start": month_start,
-            "distance": 0,
-            "duration": 0,
-            "count": 0,
-            "average_pace": 0
-        },
-        "yearly": {
-            "year_start": year_start,
-            "distance": 0,
-            "duration": 0,
-            "count": 0,
-            "average_pace": 0
-        },
-        "totally": {
-            "year_start": datetime.now(timezone.utc),
-            "distance": 0,
-            "duration": 0,
-            "count": 0,
-            "average_pace": 0
-        }
-    }
-    await db.statistics.insert_one(statistics_data)
+    # 통계 데이터 초기화 (이번 주 월요일 / 이번 달 1일 / 올해 1월 1일 기준)
+    await db.statistics.insert_one(empty_statistics(result.inserted_id, datetime.now(timezone.utc)))
     
     return {"id": str(result.inserted_id), "username": user.username}
 
 
 @router.get("/me", response_model=User)
-async def read_users_me(token: dict = Depends(decode_token), db=Depends(get_database)):
-    if token is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    username: str = token.get("sub")
-    if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = await db.users.find_one({"username": username})
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+async def read_users_me(user: dict = Depends(get_current_user)):
     return user
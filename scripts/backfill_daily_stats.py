@@ -0,0 +1,71 @@
+# runs 컬렉션에서 daily_stats 일별 집계를 다시 만든다 (서버 측 $group + $merge)
+# 실행: python -m scripts.backfill_daily_stats [--user-id <id>]
+# 전체 백필이 끝나면 rebuild_checkpoints에 완료 표시 -> 그때부터 그래프가 runs 대신 daily_stats를 읽음
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from stats_rollup import DAILY_STATS_CHECKPOINT
+
+
+def build_pipeline(user_id: str = None):
+    pipeline = []
+    if user_id:
+        pipeline.append({"$match": {"user_id": ObjectId(user_id)}})
+    pipeline += [
+        {"$project": {"user_id": 1, "date": 1, "distance": 1, "duration": 1}},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateFromParts": {
+                    "year": {"$year": "$date"}, "month": {"$month": "$date"}, "day": {"$dayOfMonth": "$date"}
+                }}
+            },
+            "distance": {"$sum": "$distance"},
+            "duration": {"$sum": "$duration"},
+            "count": {"$sum": 1},
+            "run_ids": {"$push": "$_id"}  # 후처리 작업이 재시도돼도 같은 런을 다시 더하지 않도록
+        }},
+        {"$project": {
+            "_id": 0, "user_id": "$_id.user_id", "day": "$_id.day",
+            "distance": 1, "duration": 1, "count": 1, "run_ids": 1
+        }},
+        {"$merge": {
+            "into": "daily_stats",
+            "on": ["user_id", "day"],
+            "whenMatched": [{"$set": {
+                "distance": "$$new.distance", "duration": "$$new.duration", "count": "$$new.count", "run_ids": "$$new.run_ids"
+            }}],
+            "whenNotMatched": "insert"
+        }}
+    ]
+    return pipeline
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily_stats from runs")
+    parser.add_argument("--user-id", help="Only rebuild this user")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        await db.runs.aggregate(build_pipeline(args.user_id)).to_list(length=None)
+        # 그래프가 바뀌었으므로 대시보드 ETag 무효화
+        await db.statistics.update_many({"user_id": ObjectId(args.user_id)} if args.user_id else {}, {"$inc": {"version": 1}})
+        if not args.user_id:
+            await db.rebuild_checkpoints.update_one(
+                {"_id": DAILY_STATS_CHECKPOINT},
+                {"$set": {"completed_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        print(f"daily_stats rebuilt: {await db.daily_stats.estimated_document_count()} documents")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+# runs 컬렉션에서 users.recent_runs(최근 런 요약)를 채운다 (서버 측 $group $topN + $merge)
+# 실행: python -m scripts.backfill_recent_runs [--user-id <id>]
+import argparse
+import asyncio
+
+from bson import ObjectId
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from routes.running_sessions import RECENT_RUNS_LIMIT, RUN_SUMMARY_FIELDS
+
+
+def build_pipeline(user_id: str = None):
+    pipeline = []
+    if user_id:
+        pipeline.append({"$match": {"user_id": ObjectId(user_id)}})
+    pipeline += [
+        {"$project": {"user_id": 1, **{field: 1 for field in RUN_SUMMARY_FIELDS}}},
+        {"$group": {
+            "_id": "$user_id",
+            "recent_runs": {"$topN": {
+                "n": RECENT_RUNS_LIMIT,
+                "sortBy": {"date": -1},
+                "output": {"_id": "$_id", **{field: f"${field}" for field in RUN_SUMMARY_FIELDS}}
+            }}
+        }},
+        {"$merge": {
+            "into": "users",
+            "on": "_id",
+            "whenMatched": [{"$set": {"recent_runs": "$$new.recent_runs"}}],
+            "whenNotMatched": "discard"
+        }}
+    ]
+    return pipeline
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fill users.recent_runs from runs")
+    parser.add_argument("--user-id", help="Only backfill this user")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        await db.runs.aggregate(build_pipeline(args.user_id)).to_list(length=None)
+        # 런이 없는 유저도 빈 배열로 채워 홈 화면이 runs를 조회하지 않도록
+        query = {"recent_runs": {"$exists": False}}
+        if args.user_id:
+            query["_id"] = ObjectId(args.user_id)
+        result = await db.users.update_many(query, {"$set": {"recent_runs": []}})
+        print(f"recent_runs backfilled ({result.modified_count} users without runs)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# 런 후처리(통계 / 일별 집계) 동시성 확인: 임시 유저로 N개의 런을 동시에 반영하고 합계를 검증
+# 각 런은 두 번씩 반영 (작업 재시도) -> 한 번만 집계돼야 함
+# 두 경우를 확인: 가입 때처럼 statistics 문서가 있는 유저 / 문서가 없는 유저 (동시에 upsert로 처음 만드는 경우)
+# 실행: python -m scripts.check_statistics_concurrency [-n 50]
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from indexes import ensure_unique_indexes
+from routes.running_sessions import apply_daily_stats, apply_run_statistics
+from stats_rollup import empty_statistics
+
+
+async def check(db, n: int, seeded: bool):
+    user_id = ObjectId()
+    now = datetime.now(timezone.utc)
+    failures = []
+    try:
+        if seeded:
+            await db.statistics.insert_one(empty_statistics(user_id, now))
+        runs = [
+            {"_id": ObjectId(), "user_id": user_id, "date": now, "distance": 1.5, "duration": 600 + i, "average_pace": 6.0}
+            for i in range(n)
+        ]
+        await asyncio.gather(*(step(db, run) for run in runs + runs for step in (apply_run_statistics, apply_daily_stats)))
+
+        expected_distance = sum(run["distance"] for run in runs)
+        expected_duration = sum(run["duration"] for run in runs)
+        docs = await db.statistics.find({"user_id": user_id}).to_list(length=None)
+        if len(docs) != 1:
+            return [f"{len(docs)} statistics documents (expected 1)"]
+        periods = {field: docs[0][field] for field in ("weekly", "monthly", "yearly", "totally")}
+        days = await db.daily_stats.find({"user_id": user_id}).to_list(length=None)
+        if len(days) != 1:
+            return [f"{len(days)} daily_stats documents (expected 1)"]
+        periods["daily"] = days[0]
+        for field, period in periods.items():
+            if period["count"] != n:
+                failures.append(f"{field}.count={period['count']} (expected {n})")
+            if abs(period["distance"] - expected_distance) > 1e-6:
+                failures.append(f"{field}.distance={period['distance']} (expected {expected_distance})")
+            if period["duration"] != expected_duration:
+                failures.append(f"{field}.duration={period['duration']} (expected {expected_duration})")
+    finally:
+        await db.statistics.delete_many({"user_id": user_id})
+        await db.daily_stats.delete_many({"user_id": user_id})
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fire concurrent run completions and verify statistics totals")
+    parser.add_argument("-n", type=int, default=50, help="Number of concurrent run completions")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    db = get_database()
+    failures = []
+    try:
+        await ensure_unique_indexes(db)
+        for seeded in (True, False):
+            label = "registered user" if seeded else "no statistics document"
+            failures += [f"{label}: {failure}" for failure in await check(db, args.n, seeded)]
+    finally:
+        await close_mongo_connection()
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print(f"OK: {args.n} concurrent updates applied (with and without an existing statistics document)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+# 런을 끝낸 유저의 GET /users/me 확인: 가입 -> 로그인 -> 세션 시작/종료 -> 후처리(post_run) -> /users/me
+# recent_runs에 방금 끝낸 런이 들어 있고 200으로 응답하는지 검증 (ObjectId 직렬화 회귀 확인)
+# 실행: python -m scripts.check_users_me [--backend fake|mongod] [--mongo-url mongodb://localhost:27017]
+# - mongod: 임시 DB를 만들어 사용하고 끝나면 삭제
+import argparse
+import asyncio
+import sys
+import uuid
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.fake_motor import FakeDatabase
+from database import get_analytics_database, get_database
+from main import app
+from routes.running_sessions import process_post_run
+
+PASSWORD = "check-password"
+
+
+async def check(client: httpx.AsyncClient, db):
+    username = f"check-{uuid.uuid4().hex[:8]}"
+    response = await client.post("/users/register", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    response = await client.post("/users/login", json={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.post("/running_sessions/start", headers={"x-user-id": user_id})
+    response.raise_for_status()
+    session_id = response.json()["session_id"]
+    body = {"distance": 1.2, "duration": 420, "average_pace": 5.8, "lat": [37.5665, 37.5670], "lng": [126.9780, 126.9790]}
+    response = await client.post(f"/running_sessions/{session_id}/end", json=body)
+    response.raise_for_status()
+    run_id = response.json()["run_id"]
+    # 작업 큐 워커는 lifespan에서 시작되므로 여기서는 후처리를 직접 실행
+    await process_post_run(db, {"run_id": ObjectId(run_id)})
+
+    response = await client.get("/users/me", headers=headers)
+    failures = []
+    if response.status_code != 200:
+        failures.append(f"GET /users/me -> {response.status_code}: {response.text[:200]}")
+    else:
+        recent = response.json().get("recent_runs") or []
+        if not recent or recent[0].get("_id") != run_id:
+            failures.append(f"recent_runs does not start with run {run_id}: {recent}")
+    return failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check GET /users/me after a finished run")
+    parser.add_argument("--backend", choices=("fake", "mongod"), default="fake")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    args = parser.parse_args()
+
+    mongo_client = None
+    if args.backend == "fake":
+        db = FakeDatabase()
+    else:
+        mongo_client = AsyncIOMotorClient(args.mongo_url)
+        db = mongo_client.get_database(f"runaway_check_{uuid.uuid4().hex[:8]}")
+
+    # ASGITransport는 lifespan(startup)을 실행하지 않으므로 DB 의존성을 교체
+    app.dependency_overrides[get_database] = lambda: db
+    app.dependency_overrides[get_analytics_database] = lambda: db
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            failures = await check(client, db)
+    finally:
+        app.dependency_overrides.clear()
+        if mongo_client is not None:
+            await mongo_client.drop_database(db.name)
+            mongo_client.close()
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: /users/me returns the finished run in recent_runs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
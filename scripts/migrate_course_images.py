@@ -0,0 +1,42 @@
+# courses 문서에 들어 있는 이미지(route Binary)를 GridFS course_images 버킷으로 옮긴다
+# 실행: python -m scripts.migrate_course_images [--dry-run] [--limit N]
+import argparse
+import asyncio
+
+from course_images import store_course_image
+from database import connect_to_mongo, close_mongo_connection, get_database
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move embedded course images into GridFS")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after N courses (0 = all)")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        moved = total_bytes = 0
+        cursor = db.courses.find({"route": {"$type": "binData"}}, {"route": 1})
+        if args.limit:
+            cursor = cursor.limit(args.limit)
+        async for course in cursor:
+            data = bytes(course["route"])
+            total_bytes += len(data)
+            moved += 1
+            if args.dry_run:
+                continue
+            image_id, etag = await store_course_image(db, data, course["_id"])
+            # 업로드 후 문서 갱신 -> 중간에 멈춰도 route가 남아 있는 코스만 다시 처리됨
+            await db.courses.update_one(
+                {"_id": course["_id"]},
+                {"$set": {"image_id": image_id, "image_etag": etag}, "$unset": {"route": ""}}
+            )
+        prefix = "[dry-run] " if args.dry_run else ""
+        print(f"{prefix}moved {moved} course images ({total_bytes / 1024 / 1024:.1f} MiB)")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+# 기존 runs / running_sessions 문서의 route 배열을 route_codec Binary 포맷으로 변환
+# 실행: python -m scripts.migrate_route_encoding [--dry-run] [--batch-size 500]
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from route_codec import encode_route, is_encoded_route
+
+COLLECTIONS = ("runs", "running_sessions")
+
+
+async def migrate_collection(collection, batch_size: int, dry_run: bool):
+    converted = skipped = 0
+    operations = []
+    cursor = collection.find({"route": {"$type": "array"}}, {"route": 1})
+    async for doc in cursor:
+        encoded = encode_route(doc["route"])
+        if not is_encoded_route(encoded):
+            skipped += 1  # 알 수 없는 키가 섞인 경로는 그대로 둔다
+            continue
+        converted += 1
+        # 동시에 다른 값으로 바뀐 문서는 덮어쓰지 않도록 원본 route를 조건에 포함
+        operations.append(UpdateOne({"_id": doc["_id"], "route": doc["route"]}, {"$set": {"route": encoded}}))
+        if len(operations) >= batch_size:
+            if not dry_run:
+                await collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations and not dry_run:
+        await collection.bulk_write(operations, ordered=False)
+    return converted, skipped
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Encode stored GPS routes with route_codec")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        for name in COLLECTIONS:
+            converted, skipped = await migrate_collection(db[name], args.batch_size, args.dry_run)
+            prefix = "[dry-run] " if args.dry_run else ""
+            print(f"{prefix}{name}: converted={converted} skipped={skipped}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
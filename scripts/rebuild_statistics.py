@@ -0,0 +1,206 @@
+# runs 컬렉션에서 statistics(weekly/monthly/yearly/totally)를 다시 계산한다
+# 유저를 _id 순 배치로 나눠 배치마다 runs에 $group 한 번, 결과는 bulk_write 한 번으로 반영
+# 실행: python -m scripts.rebuild_statistics [--batch-size 500] [--workers 8] [--shard 0/4] [--dry-run] [--restart]
+# - --shard i/n: 유저 _id 기준으로 n개로 나눈 것 중 i번째만 처리 (여러 프로세스/머신에서 나눠 실행)
+# - 진행 상황은 rebuild_checkpoints 컬렉션에 저장 -> 중단 후 다시 실행하면 이어서 처리 (--restart로 처음부터)
+# - --dry-run: 쓰지 않고 저장된 값과 다른 유저만 출력
+# 재계산과 동시에 끝난 런은 해당 배치가 쓰이는 순간 덮어써질 수 있으므로 트래픽이 적을 때 실행
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from stats_rollup import period_starts
+
+CHECKPOINTS = "rebuild_checkpoints"
+FIELDS = ("distance", "duration", "count", "average_pace")
+
+
+# start 이후 런만 합산 (start가 없으면 전체)
+def _period_sums(prefix: str, start: datetime = None):
+    def when(value):
+        if start is None:
+            return {"$sum": value}
+        return {"$sum": {"$cond": [{"$gte": ["$date", start]}, value, 0]}}
+
+    return {
+        f"{prefix}_distance": when("$distance"),
+        f"{prefix}_duration": when("$duration"),
+        f"{prefix}_count": when(1),
+        f"{prefix}_pace": when("$average_pace"),
+    }
+
+
+def build_pipeline(user_ids, now: datetime):
+    group = {"_id": "$user_id", "first_run": {"$min": "$date"}}
+    for field, (_, start) in period_starts(now).items():
+        group.update(_period_sums(field, start))
+    group.update(_period_sums("totally"))
+    return [
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$project": {"user_id": 1, "date": 1, "distance": 1, "duration": 1, "average_pace": 1}},
+        {"$group": group},
+    ]
+
+
+def _period(row, prefix):
+    count = row.get(f"{prefix}_count", 0) if row else 0
+    return {
+        "distance": row[f"{prefix}_distance"] if count else 0,
+        "duration": row[f"{prefix}_duration"] if count else 0,
+        "count": count,
+        "average_pace": row[f"{prefix}_pace"] / count if count else 0,
+    }
+
+
+# $group 결과 한 줄(런이 없으면 None) -> statistics $set
+def statistics_fields(row, now: datetime):
+    fields = {}
+    for field, (start_key, start) in period_starts(now).items():
+        fields[field] = {start_key: start, **_period(row, field)}
+    for key, value in _period(row, "totally").items():
+        fields[f"totally.{key}"] = value
+    return fields
+
+
+def _diff(stored, fields):
+    changes = []
+    for path, expected in fields.items():
+        current = stored or {}
+        for part in path.split("."):
+            current = current.get(part) if isinstance(current, dict) else None
+        if isinstance(expected, dict):
+            for key in FIELDS:
+                before = current.get(key) if isinstance(current, dict) else None
+                if before is None or abs(before - expected[key]) > 1e-6:
+                    changes.append(f"{path}.{key}: {before} -> {expected[key]}")
+        elif current is None or abs(current - expected) > 1e-6:
+            changes.append(f"{path}: {current} -> {expected}")
+    return changes
+
+
+async def rebuild_batch(db, user_ids, now: datetime, dry_run: bool, report):
+    rows = await db.runs.aggregate(build_pipeline(user_ids, now)).to_list(length=None)
+    by_user = {row["_id"]: row for row in rows}
+
+    if dry_run:
+        stored = {doc["user_id"]: doc async for doc in db.statistics.find({"user_id": {"$in": user_ids}})}
+        for user_id in user_ids:
+            changes = _diff(stored.get(user_id), statistics_fields(by_user.get(user_id), now))
+            if changes:
+                report["changed"] += 1
+                if report["changed"] <= report["show"]:
+                    print(f"{user_id}:\n  " + "\n  ".join(changes))
+        return
+
+    operations = []
+    for user_id in user_ids:
+        row = by_user.get(user_id)
+        update = {"$set": statistics_fields(row, now)}
+        update["$setOnInsert"] = {"totally.year_start": row["first_run"] if row else now}
+        update["$inc"] = {"version": 1}  # 대시보드 ETag 무효화
+        operations.append(UpdateOne({"user_id": user_id}, update, upsert=True))
+    await db.statistics.bulk_write(operations, ordered=False)
+
+
+async def user_batches(db, shard: int, shards: int, after, batch_size: int):
+    query = {"_id": {"$gt": after}} if after is not None else {}
+    batch = []
+    async for user in db.users.find(query, {"_id": 1}).sort("_id", 1).batch_size(5000):
+        if shards > 1 and int(str(user["_id"]), 16) % shards != shard:
+            continue
+        batch.append(user["_id"])
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild statistics documents from runs")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per aggregation")
+    parser.add_argument("--workers", type=int, default=8, help="Batches processed concurrently")
+    parser.add_argument("--shard", default="0/1", help="i/n: process only the i-th of n user partitions")
+    parser.add_argument("--dry-run", action="store_true", help="Print users whose stored statistics differ, write nothing")
+    parser.add_argument("--show", type=int, default=50, help="Users to print in --dry-run")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+    shard, shards = (int(x) for x in args.shard.split("/"))
+
+    await connect_to_mongo()
+    db = get_database()
+    checkpoint_id = f"statistics:{shard}/{shards}"
+    try:
+        checkpoint = None if args.restart or args.dry_run else await db[CHECKPOINTS].find_one({"_id": checkpoint_id})
+        if checkpoint and checkpoint.get("completed_at"):
+            print(f"{checkpoint_id} already completed at {checkpoint['completed_at']} (use --restart to run again)")
+            return
+        # 이어서 실행해도 기간 기준(이번 주/달/해)이 바뀌지 않도록 처음 시작한 시각을 그대로 사용
+        now = checkpoint["as_of"].replace(tzinfo=timezone.utc) if checkpoint else datetime.now(timezone.utc)
+        after = checkpoint["last_user_id"] if checkpoint else None
+        processed = checkpoint["processed"] if checkpoint else 0
+        if not args.dry_run:
+            await db[CHECKPOINTS].replace_one(
+                {"_id": checkpoint_id},
+                {**(checkpoint or {"processed": 0}), "as_of": now, "updated_at": datetime.now(timezone.utc)},
+                upsert=True
+            )
+        if after is not None:
+            print(f"Resuming {checkpoint_id} after user {after} ({processed} users done)")
+
+        report = {"changed": 0, "show": args.show}
+        semaphore = asyncio.Semaphore(args.workers)
+        finished = {}  # 배치 번호 -> (마지막 user _id, 유저 수)
+        next_to_commit = 0
+        checkpoint_lock = asyncio.Lock()  # 체크포인트 쓰기 순서 보장
+        tasks = set()
+        started = time.perf_counter()
+
+        # 배치는 순서 없이 끝나므로 앞 배치가 모두 끝난 지점까지만 체크포인트를 전진
+        async def commit_checkpoint():
+            nonlocal next_to_commit, processed
+            async with checkpoint_lock:
+                last = None
+                while next_to_commit in finished:
+                    last, count = finished.pop(next_to_commit)
+                    processed += count
+                    next_to_commit += 1
+                if last is not None and not args.dry_run:
+                    await db[CHECKPOINTS].update_one(
+                        {"_id": checkpoint_id},
+                        {"$set": {"last_user_id": last, "processed": processed, "updated_at": datetime.now(timezone.utc)}}
+                    )
+                    print(f"{processed} users rebuilt ({processed / (time.perf_counter() - started):.0f}/s)")
+
+        async def run(index, batch):
+            try:
+                await rebuild_batch(db, batch, now, args.dry_run, report)
+                finished[index] = (batch[-1], len(batch))
+                await commit_checkpoint()
+            finally:
+                semaphore.release()
+
+        index = 0
+        async for batch in user_batches(db, shard, shards, after, args.batch_size):
+            await semaphore.acquire()
+            task = asyncio.create_task(run(index, batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            index += 1
+        await asyncio.gather(*tasks)
+
+        if args.dry_run:
+            print(f"{report['changed']} of {processed} users differ")
+        else:
+            await db[CHECKPOINTS].update_one({"_id": checkpoint_id}, {"$set": {"completed_at": datetime.now(timezone.utc)}})
+            print(f"statistics rebuilt for {processed} users in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+# 작업 큐 워커 (API 프로세스와 별도로 실행할 때, API 쪽은 JOB_WORKERS_IN_PROCESS=0)
+# 실행: python -m scripts.run_jobs [--concurrency 8] [--processes 2] [--metrics-port 9101]
+# 프로세스마다 --metrics-port + 프로세스 번호로 Prometheus 지표를 노출
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from prometheus_client import start_http_server
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from indexes import ensure_unique_indexes
+from jobs import JobWorkerPool, load_handlers
+from settings import settings
+
+
+async def run_worker(concurrency: int):
+    handlers = load_handlers()
+    print(f"Job worker started: concurrency={concurrency} types={sorted(handlers)}")
+    await connect_to_mongo()
+    await ensure_unique_indexes(get_database())  # 후처리 upsert가 의존하는 유니크 인덱스
+    pool = JobWorkerPool(concurrency, settings.JOB_POLL_INTERVAL_S)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    pool.start(get_database)
+    try:
+        await stop.wait()
+    finally:
+        await pool.stop()
+        await close_mongo_connection()
+        print(f"Job worker stopped: {pool.stats()}")
+
+
+def worker_process(concurrency: int, metrics_port: int):
+    if metrics_port:
+        start_http_server(metrics_port)
+    asyncio.run(run_worker(concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent jobs per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--metrics-port", type=int, default=0, help="First Prometheus port (0 = disabled)")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        worker_process(args.concurrency, args.metrics_port)
+        return
+    processes = [
+        multiprocessing.Process(target=worker_process, args=(args.concurrency, args.metrics_port + i if args.metrics_port else 0))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# 선언된 인덱스(indexes.require_index)를 DB와 맞추고, 대표 쿼리가 COLLSCAN을 쓰지 않는지 확인
+# 실행: python -m scripts.sync_indexes [--dry-run] [--drop-unknown] [--check-plans]
+import argparse
+import asyncio
+import sys
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from indexes import check_query_plans, sync_indexes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reconcile declared MongoDB indexes")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--drop-unknown", action="store_true", help="Drop indexes that are not declared")
+    parser.add_argument("--check-plans", action="store_true", help="Fail if any declared query uses a COLLSCAN")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        report = await sync_indexes(db, drop_unknown=args.drop_unknown, dry_run=args.dry_run)
+        for key in ("created", "existing", "unknown", "dropped"):
+            for name in report[key]:
+                print(f"{key:>8}: {name}")
+        failures = await check_query_plans(db) if args.check_plans else []
+    finally:
+        await close_mongo_connection()
+
+    if failures:
+        print("Queries without a usable index:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
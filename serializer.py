@@ -0,0 +1,134 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any
+
+from bson import ObjectId
+from bson.binary import Binary
+from bson.decimal128 import Decimal128
+from bson.int64 import Int64
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from route_codec import ROUTE_FIELDS, decode_columns, is_encoded_route
+
+# Motor 문서(ObjectId, datetime, Binary, 중첩 배열)를 한 번의 순회로 JSON bytes로 직렬화
+# jsonable_encoder처럼 중간 dict/list를 새로 만들지 않고 바로 문자열 조각을 이어 붙인다
+
+_encode_str = json.encoder.encode_basestring
+
+
+def _float(value: float) -> str:
+    if value != value or value in (float("inf"), float("-inf")):
+        return "null"
+    return float.__repr__(value)
+
+
+# 압축된 경로는 dict로 풀지 않고 컬럼에서 바로 [{"lat":..,"lng":..}, ...] 문자열 생성
+def _write_route(value: bytes, out: list):
+    columns = decode_columns(value)
+    present = [(name, values) for name, values in zip(ROUTE_FIELDS, columns) if values is not None]
+    template = "{{" + ",".join(f'"{name}":{{}}' for name, _ in present) + "}}"
+    rows = zip(*(values for _, values in present))
+    out.append("[" + ",".join(template.format(*row) for row in rows) + "]")
+
+
+def _write_bytes(value: bytes, out: list):
+    if is_encoded_route(value):
+        _write_route(value, out)
+    else:
+        out.append('"' + base64.b64encode(value).decode() + '"')
+
+
+def _write_decimal(value: Decimal128, out: list):
+    number = value.to_decimal()
+    out.append(str(number) if number.is_finite() else "null")
+
+
+def _write_dict(value: dict, out: list):
+    if not value:
+        out.append("{}")
+        return
+    out.append("{")
+    first = True
+    for key, item in value.items():
+        if not first:
+            out.append(",")
+        first = False
+        out.append(_encode_str(key if isinstance(key, str) else str(key)))
+        out.append(":")
+        _write(item, out)
+    out.append("}")
+
+
+def _write_list(value, out: list):
+    if not value:
+        out.append("[]")
+        return
+    out.append("[")
+    first = True
+    for item in value:
+        if not first:
+            out.append(",")
+        first = False
+        _write(item, out)
+    out.append("]")
+
+
+_WRITERS = {
+    str: lambda v, out: out.append(_encode_str(v)),
+    int: lambda v, out: out.append(int.__repr__(v)),
+    Int64: lambda v, out: out.append(int.__repr__(v)),
+    float: lambda v, out: out.append(_float(v)),
+    bool: lambda v, out: out.append("true" if v else "false"),
+    type(None): lambda v, out: out.append("null"),
+    dict: _write_dict,
+    list: _write_list,
+    tuple: _write_list,
+    ObjectId: lambda v, out: out.append('"' + str(v) + '"'),
+    datetime: lambda v, out: out.append('"' + v.isoformat() + '"'),
+    date: lambda v, out: out.append('"' + v.isoformat() + '"'),
+    bytes: _write_bytes,
+    Binary: _write_bytes,
+    Decimal128: _write_decimal,
+}
+
+
+def _write(value: Any, out: list):
+    writer = _WRITERS.get(type(value))
+    if writer is not None:
+        writer(value, out)
+    elif isinstance(value, BaseModel):
+        _write(value.model_dump(mode="python", by_alias=True), out)
+    elif isinstance(value, dict):
+        _write_dict(value, out)
+    elif isinstance(value, (list, tuple)):
+        _write_list(value, out)
+    elif isinstance(value, bytes):
+        _write_bytes(value, out)
+    # 기본 타입의 하위 클래스 (IntEnum 등)
+    elif isinstance(value, int):
+        out.append(int.__repr__(value))
+    elif isinstance(value, float):
+        out.append(_float(value))
+    elif isinstance(value, str):
+        out.append(_encode_str(value))
+    elif isinstance(value, (datetime, date)):
+        out.append('"' + value.isoformat() + '"')
+    else:
+        encoded = jsonable_encoder(value, custom_encoder={ObjectId: str})
+        if type(encoded) is type(value):  # 더 풀 수 없는 값은 문자열로 (무한 재귀 방지)
+            encoded = str(value)
+        _write(encoded, out)
+
+
+def dumps(value: Any) -> bytes:
+    out = []
+    _write(value, out)
+    return "".join(out).encode()
+
+
+class BSONJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,16 +1,54 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
+from typing import Optional
 
 # .env 파일 로드
 load_dotenv()
 
 class Settings(BaseSettings):
     MONGODB_URL: str
+    MONGO_CLIENT_PROFILE: str = "default"  # database.CLIENT_PROFILES: default | api | batch
+    MONGO_MAX_POOL_SIZE: Optional[int] = None  # 아래 MONGO_* 값은 설정된 경우에만 프로필 값을 덮어씀
+    MONGO_MIN_POOL_SIZE: Optional[int] = None
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_CONNECT_TIMEOUT_MS: Optional[int] = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: Optional[int] = None
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGO_COMPRESSORS: Optional[str] = None  # 예: "zstd,snappy,zlib"
+    MONGO_ANALYTICS_MAX_STALENESS_S: int = -1  # 세컨더리 읽기 허용 지연 (-1 = 제한 없음, 설정 시 90 이상)
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    BCRYPT_ROUNDS: int = 12  # 바꾸면 다음 로그인 때 비밀번호가 새 cost로 재해싱됨
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt 전용 스레드 수
+    PASSWORD_HASH_MAX_CONCURRENCY: int = 8  # 동시에 스레드 풀에 넣는 해싱 작업 수 (나머지는 대기)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # 검증된 토큰 payload LRU 크기
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL_S: float = 30  # 유저 문서 캐시 유지 시간
+    SLOW_QUERY_MS: float = 200  # 이보다 오래 걸린 Mongo 명령은 경고 로그
+    METRICS_REPLY_BYTES: bool = False  # Mongo 응답 크기 측정 (응답마다 다시 BSON 인코딩하므로 조사할 때만 켬)
+    ROUTE_SIMPLIFY_TOLERANCE_M: float = 3.0  # 경로 단순화 허용 오차(m), 0이면 단순화 안 함
+    STORE_RAW_ROUTE: bool = False  # 단순화 전 원본 경로도 raw_route로 저장 (켜면 런 문서 크기가 다시 커짐)
+    COURSE_LATEST_RADIUS_M: int = 50000  # /courses/latest 기본 검색 반경
+    COURSE_RECOMMEND_RADIUS_M: int = 5000  # /courses/recommend 기본 검색 반경
+    COURSE_MAX_RADIUS_M: int = 100000  # 클라이언트가 지정할 수 있는 최대 반경
+    COURSE_CACHE_BACKEND: str = "memory"  # memory | redis
+    COURSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    COURSE_CACHE_TTL_S: float = 60
+    COURSE_CACHE_MAX_ENTRIES: int = 5000
+    COURSE_CACHE_PRECISION: int = 6  # 결과 캐시 geohash 셀 정밀도 (6 -> 약 1.2km x 0.6km)
+    RECOMMENDATION_FLUSH_INTERVAL_S: float = 5  # recommendation_count 버퍼 flush 주기 (최대 유실 범위)
+    RECOMMENDATION_MAX_PENDING: int = 10000  # 버퍼에 쌓인 증가분이 이만큼이면 즉시 flush
+    JOB_WORKERS_IN_PROCESS: int = 2  # API 프로세스 안에서 도는 작업 큐 워커 수 (0이면 scripts.run_jobs로 따로 실행)
+    JOB_POLL_INTERVAL_S: float = 1.0  # 처리할 작업이 없을 때 다시 조회하는 간격
+    JOB_LEASE_S: float = 60  # 이 시간 안에 끝나지 않은 작업은 다른 워커가 다시 가져감
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_S: float = 2  # 재시도 간격: base * 2^(attempts-1), 최대 JOB_RETRY_MAX_S
+    JOB_RETRY_MAX_S: float = 300
+    JOB_METRICS_INTERVAL_S: float = 15  # 큐 깊이/지연 지표 갱신 주기
 
     class Config:
         env_file = ".env"
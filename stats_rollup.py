@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from indexes import require_index
+
+# daily_stats: (user_id, day) 단위 일별 집계. 런이 끝날 때마다 $inc로 갱신
+# { user_id, day(UTC 자정), distance, duration, count, run_ids(반영한 런) }
+
+# 일별 집계 upsert 키 / 그래프 기간 조회 ($merge 백필에도 유니크 인덱스 필요)
+require_index("daily_stats", [("user_id", 1), ("day", 1)], unique=True, query={"user_id": ObjectId(), "day": {"$gte": datetime(2024, 1, 1)}})
+
+# 그래프 단위별 $group 키 연산자
+GROUP_OPERATORS = {
+    "weekday": "$isoDayOfWeek",  # 1=월 ... 7=일
+    "day": "$dayOfMonth",
+    "month": "$month",
+    "year": "$year",
+}
+
+
+def day_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc)
+
+
+# statistics 문서의 기간 필드 -> (시작일 키, 달력 기준 시작일): 이번 주 월요일 / 이번 달 1일 / 올해 1월 1일
+def period_starts(now: datetime):
+    return {
+        "weekly": ("week_start", day_start(now - timedelta(days=now.weekday()))),
+        "monthly": ("month_start", datetime(now.year, now.month, 1, tzinfo=timezone.utc)),
+        "yearly": ("year_start", datetime(now.year, 1, 1, tzinfo=timezone.utc)),
+    }
+
+
+# Mongo에서 읽은 날짜는 naive(UTC)일 수 있음
+def is_current_period(stored_start: datetime, start: datetime) -> bool:
+    if stored_start is None:
+        return False
+    if stored_start.tzinfo is None:
+        stored_start = stored_start.replace(tzinfo=timezone.utc)
+    return stored_start >= start
+
+
+def _accumulate(field: str, distance: float, duration: int, average_pace: float):
+    count = {"$ifNull": [f"${field}.count", 0]}
+    return {
+        "distance": {"$add": [{"$ifNull": [f"${field}.distance", 0]}, distance]},
+        "duration": {"$add": [{"$ifNull": [f"${field}.duration", 0]}, duration]},
+        "count": {"$add": [count, 1]},
+        "average_pace": {"$divide": [
+            {"$add": [{"$multiply": [{"$ifNull": [f"${field}.average_pace", 0]}, count]}, average_pace]},
+            {"$add": [count, 1]}
+        ]},
+    }
+
+
+# statistics 기간 필드 -> $dateTrunc 단위
+PERIOD_UNITS = {"weekly": "week", "monthly": "month", "yearly": "year"}
+
+
+# 저장된 시작일을 달력 기준으로 맞춤
+# 예전 코드는 기간이 바뀔 때 런 시각(예: 수요일 09:30)을 그대로 *_start에 저장했으므로 비교 전에 내림
+def _aligned_start(field: str, start_key: str):
+    trunc = {"date": f"${field}.{start_key}", "unit": PERIOD_UNITS[field]}
+    if PERIOD_UNITS[field] == "week":
+        trunc["startOfWeek"] = "monday"
+    return {"$dateTrunc": trunc}
+
+
+# 가입 시 만드는 빈 statistics 문서
+def empty_statistics(user_id: ObjectId, now: datetime):
+    statistics = {"user_id": user_id}
+    for field, (start_key, start) in period_starts(now).items():
+        statistics[field] = {start_key: start, "distance": 0, "duration": 0, "count": 0, "average_pace": 0}
+    statistics["totally"] = {"year_start": now, "distance": 0, "duration": 0, "count": 0, "average_pace": 0}
+    statistics["version"] = 0  # 통계가 바뀔 때마다 증가 (/stats/dashboard ETag)
+    return statistics
+
+
+# statistics.applied_runs에 남겨 두는 최근 반영 런 수 (작업 재시도 중복 반영 방지용)
+APPLIED_RUNS_LIMIT = 100
+
+
+# 런 하나를 statistics 문서에 반영하는 update pipeline
+# 기간이 바뀌었으면(저장된 시작일 < 런의 기간 시작일) 해당 기간을 이번 런 값으로 초기화
+# 저장된 기간이 더 최신이면(작업 큐에서 늦게 처리된 지난 기간의 런) 그 기간은 그대로 둠
+# 한 번의 update_one으로 서버에서 원자적으로 처리되므로 동시에 끝난 런도 누락되지 않음
+# run_id를 주면 applied_runs에 기록 -> 필터에 {"applied_runs": {"$ne": run_id}}를 붙여 같은 런을 두 번 반영하지 않음
+def statistics_update_pipeline(now: datetime, distance: float, duration: int, average_pace: float, run_id: ObjectId = None):
+    fields = {}
+    for field, (start_key, start) in period_starts(now).items():
+        fields[field] = {"$cond": [
+            {"$eq": [_aligned_start(field, start_key), start]},
+            {start_key: start, **_accumulate(field, distance, duration, average_pace)},
+            {"$cond": [
+                {"$gt": [_aligned_start(field, start_key), start]},
+                f"${field}",
+                {start_key: start, "distance": distance, "duration": duration, "count": 1, "average_pace": average_pace},
+            ]},
+        ]}
+    fields["totally"] = {
+        "year_start": {"$ifNull": ["$totally.year_start", now]},  # 생성일
+        **_accumulate("totally", distance, duration, average_pace),
+    }
+    fields["version"] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    if run_id is not None:
+        fields["applied_runs"] = {"$slice": [
+            {"$concatArrays": [{"$ifNull": ["$applied_runs", []]}, [run_id]]}, -APPLIED_RUNS_LIMIT
+        ]}
+    return [{"$set": fields}]
+
+
+# 이미 반영한 런이면 필터({"<배열>": {"$ne": run_id}})가 맞지 않아 upsert가 유니크 인덱스에 걸림
+# 필터에 $ne가 있어 Mongo가 upsert를 재시도하지 않으므로, 동시에 문서를 처음 만드는 경우에도 같은 에러가 남
+# -> upsert 없이 한 번 더 갱신하고, 그래도 맞는 문서가 없을 때만 이미 반영된 것으로 봄
+async def _upsert_once(collection, query, update) -> bool:
+    try:
+        await collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        result = await collection.update_one(query, update)
+        return result.matched_count == 1
+    return True
+
+
+# 런을 한 번만 반영 (applied_runs), 반영했으면 True
+async def apply_statistics_once(db, user_id, run_id: ObjectId, date: datetime, distance: float, duration: int, average_pace: float) -> bool:
+    pipeline = statistics_update_pipeline(date, distance, duration, average_pace, run_id)
+    return await _upsert_once(db.statistics, {"user_id": ObjectId(user_id), "applied_runs": {"$ne": run_id}}, pipeline)
+
+
+# statistics.version: 통계나 일별 집계가 바뀔 때마다 증가 -> /stats/dashboard ETag
+async def bump_stats_version(db, user_id):
+    await db.statistics.update_one({"user_id": ObjectId(user_id)}, {"$inc": {"version": 1}})
+
+
+# run_id를 주면 run_ids에 기록하고 이미 반영한 런은 건너뜀 (apply_statistics_once와 같은 방식) -> 반영했으면 True
+async def record_daily_run(db, user_id, date: datetime, distance: float, duration: int, run_id: ObjectId = None) -> bool:
+    query = {"user_id": ObjectId(user_id), "day": day_start(date)}
+    update = {"$inc": {"distance": distance, "duration": duration, "count": 1}}
+    if run_id is not None:
+        query["run_ids"] = {"$ne": run_id}
+        update["$push"] = {"run_ids": run_id}
+    return await _upsert_once(db.daily_stats, query, update)
+
+
+# daily_stats 백필(scripts.backfill_daily_stats) 완료 표시: rebuild_checkpoints의 {_id: "daily_stats", completed_at}
+# 백필 전 daily_stats에는 배포 이후 끝난 런만 있으므로 그래프는 runs에서 직접 집계
+# 한 번 완료되면 되돌아가지 않으므로 프로세스에 기억해 두고 다시 조회하지 않음
+DAILY_STATS_CHECKPOINT = "daily_stats"
+_daily_stats_backfilled = False
+
+
+async def daily_stats_backfilled(db) -> bool:
+    global _daily_stats_backfilled
+    if not _daily_stats_backfilled:
+        checkpoint = await db.rebuild_checkpoints.find_one({"_id": DAILY_STATS_CHECKPOINT}, {"completed_at": 1})
+        _daily_stats_backfilled = bool(checkpoint and checkpoint.get("completed_at"))
+    return _daily_stats_backfilled
+
+
+# 그래프 집계 대상: 백필이 끝났으면 daily_stats(day), 아니면 runs(date)
+async def _distance_source(db):
+    if await daily_stats_backfilled(db):
+        return db.daily_stats, "day"
+    return db.runs, "date"
+
+
+# start 이후 거리 합계를 unit 단위로 묶어 {키: 거리} 반환
+async def distance_by(db, user_id: str, unit: str, start: datetime = None):
+    collection, date_field = await _distance_source(db)
+    match = {"user_id": ObjectId(user_id)}
+    if start is not None:
+        match[date_field] = {"$gte": day_start(start)}
+    rows = await collection.aggregate([
+        {"$match": match},
+        {"$project": {date_field: 1, "distance": 1}},
+        {"$group": {"_id": {GROUP_OPERATORS[unit]: f"${date_field}"}, "distance": {"$sum": "$distance"}}}
+    ]).to_list(length=None)
+    return {row["_id"]: row["distance"] for row in rows}
+
+
+def _distance_facet(unit: str, date_field: str, start: datetime = None):
+    stages = [{"$match": {date_field: {"$gte": start}}}] if start is not None else []
+    stages.append({"$group": {"_id": {GROUP_OPERATORS[unit]: f"${date_field}"}, "distance": {"$sum": "$distance"}}})
+    return stages
+
+
+# 통계 화면 그래프 4개(이번 주 요일별 / 이번 달 일별 / 올해 월별 / 연도별)를 $facet 한 번으로
+async def distance_series(db, user_id, now: datetime):
+    user_oid = ObjectId(user_id)
+    starts = period_starts(now)
+
+    collection, date_field = await _distance_source(db)
+    rows = await collection.aggregate([
+        {"$match": {"user_id": user_oid}},
+        {"$project": {date_field: 1, "distance": 1}},
+        {"$facet": {
+            "weekly": _distance_facet("weekday", date_field, starts["weekly"][1]),
+            "monthly": _distance_facet("day", date_field, starts["monthly"][1]),
+            "yearly": _distance_facet("month", date_field, starts["yearly"][1]),
+            "all_time": _distance_facet("year", date_field),
+        }}
+    ]).to_list(length=None)
+    return {name: {row["_id"]: row["distance"] for row in facet} for name, facet in rows[0].items()}
@@ -0,0 +1,26 @@
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from serializer import dumps
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson")
+STREAM_BATCH_SIZE = 100
+
+
+# Accept: application/x-ndjson 요청이면 스트리밍 응답
+def wants_ndjson(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in NDJSON_MEDIA_TYPES)
+
+
+# Motor 커서를 한 문서씩 읽어 한 줄씩 내보냄 -> 결과 크기와 무관하게 메모리 일정
+def ndjson_response(cursor, transform: Optional[Callable] = None) -> StreamingResponse:
+    async def body():
+        async for doc in cursor.batch_size(STREAM_BATCH_SIZE):
+            if transform:
+                doc = transform(doc)
+            yield dumps(doc) + b"\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPES[0])
@@ -1,14 +1,20 @@
+import asyncio
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import jwt
 from settings import settings
 from models import User
+from auth_cache import get_token_payload
+from metrics import register_app_state
 from fastapi import HTTPException, status, Header, Request
 
 from passlib.context import CryptContext
 
 async def create_user(username: str, password: str, db):
-    hashed_password = get_password_hash(password)
+    hashed_password = await hash_password(password)
     user_data = {
         "username": username, 
         "hashed_password": hashed_password,
@@ -29,7 +35,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 def create_refresh_token(data: dict):
     expire = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode = data.copy()
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": secrets.token_hex(8)})  # 같은 초에 재발급해도 토큰이 달라지도록
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -50,27 +56,19 @@ def create_refresh_token(data: dict):
 #             detail="Invalid token",
 #             headers={"WWW-Authenticate": "Bearer"},
 #         )
+# 검증된 토큰 payload는 auth_cache에 보관되어 요청마다 서명을 다시 검증하지 않음
 async def decode_token(authorization: str = Header(...)):
-    try:
-        token = authorization.split(" ")[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has expired",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-        
-        
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return await get_token_payload(authorization)
+
+
+# min/max를 기본값과 같게 두면 cost가 바뀌었을 때 verify_and_update가 새 해시를 돌려줌
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -78,11 +76,57 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+
+# bcrypt는 한 번에 수백 ms CPU를 쓰므로 이벤트 루프가 아닌 전용 스레드 풀에서 실행
+# 동시에 풀에 들어가는 작업 수는 세마포어로 제한하고, 대기 시간을 기록
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_CONCURRENCY)
+hash_stats = {"calls": 0, "in_flight": 0, "queue_wait_ms_total": 0.0, "queue_wait_ms_max": 0.0, "rehashes": 0}
+
+async def _run_password_job(fn, *args):
+    queued_at = time.perf_counter()
+
+    def job():
+        waited_ms = (time.perf_counter() - queued_at) * 1000
+        hash_stats["queue_wait_ms_total"] += waited_ms
+        hash_stats["queue_wait_ms_max"] = max(hash_stats["queue_wait_ms_max"], waited_ms)
+        return fn(*args)
+
+    async with _hash_semaphore:
+        hash_stats["calls"] += 1
+        hash_stats["in_flight"] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+        finally:
+            hash_stats["in_flight"] -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+# (일치 여부, cost 변경 시 새 해시 또는 None)
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    valid, new_hash = await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+    if new_hash:
+        hash_stats["rehashes"] += 1
+    return valid, new_hash
+
+def password_hash_stats():
+    calls = hash_stats["calls"]
+    return {
+        **hash_stats,
+        "queue_wait_ms_avg": hash_stats["queue_wait_ms_total"] / calls if calls else 0.0,
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "max_concurrency": settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    }
+
+register_app_state("password_hash", password_hash_stats)
+
 async def authenticate_user(db, username: str, password: str):
     user = await db.users.find_one({"username": username})
     if not user:
         return False
-    if not verify_password(password,user.get("hashed_password", "")):
+    valid, _ = await verify_and_update_password(password, user.get("hashed_password", ""))
+    if not valid:
         return False
     return User(**user)
 